@@ -0,0 +1,52 @@
+"""Flask-приложение только с JSON API. Не загружает Dash, pandas и plotly,
+   поэтому подходит для процессов, которые обслуживают только /api"""
+import time
+
+from flask import Flask, Response, g, request
+
+from routes.api_routes import router as api_router
+from services.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, METRICS_CONTENT_TYPE, registry
+from services.profiling import PROFILE_HEADER, save_profile, start_profile, stop_profile
+
+
+def create_api_app() -> Flask:
+    server = Flask(__name__)
+    server.register_blueprint(api_router, url_prefix="/api")
+    server.add_url_rule("/metrics", "metrics", get_metrics)
+    server.before_request(start_request)
+    server.after_request(finish_request)
+    server.teardown_request(teardown_request)
+    return server
+
+
+def get_metrics():
+    return Response(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def start_request() -> None:
+    g.started = time.perf_counter()
+    profiler = start_profile(request.headers)
+    if profiler is not None:
+        g.profiler = profiler
+
+
+def finish_request(response: Response) -> Response:
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        stop_profile(profiler)
+        response.headers[PROFILE_HEADER] = save_profile(profiler, request.endpoint or "unmatched")
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    HTTP_REQUEST_DURATION.observe(time.perf_counter() - g.started, route=route, method=request.method)
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+
+def teardown_request(exc: BaseException | None) -> None:
+    """Выключает профилировщик, если ответ так и не был сформирован, чтобы не блокировать следующие профили"""
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        stop_profile(profiler)
+
+
+if __name__ == "__main__":
+    create_api_app().run(debug=True)
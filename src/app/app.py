@@ -1,27 +1,43 @@
-import pandas as pd
 import requests
-from flask import Flask, render_template, request, redirect, url_for
+from flask import render_template, request, redirect, url_for
 import dash
-import plotly.express as px
 import plotly.graph_objects as go
 from dash import dcc, html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
 
-from services.geocoder import Geocoder
-from services.weather import WeatherService
-from utils import is_connected
+from functools import lru_cache
+from importlib import import_module
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs
+
+from api import create_api_app
 from config import config
-from routes.api_routes import router as api_router
+from dependencies import get_result_store, get_route_forecaster
+from services.http import UpstreamUnavailable
+from services.metrics import STAGE_DURATION
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from dataset import RouteDataset
+
 
+# pandas и plotly.express нужны только при построении маршрута и графиков на сервере,
+# поэтому загружаются при первом использовании, а не при запуске
+LAZY_MODULES = ("dataset", "plotly.express")
 
-server = Flask(__name__)
-server.register_blueprint(api_router, url_prefix="/api")
+server = create_api_app()
 
 app = dash.Dash(__name__, server=server, url_base_pathname="/dash/")
 
-df = pd.DataFrame()
+GRAPH_LABELS = {
+    "temperature": ("Температура в городе {city}", "Температура (°C)"),
+    "humidity": ("Влажность в городе {city}", "Влажность (%)"),
+    "probability_of_precipitation": ("Вероятность осадков в городе {city}", "Вероятность осадков (%)"),
+}
 
 app.layout = html.Div([
+    dcc.Location(id="url"),
+    dcc.Store(id="route-data"),
     html.H1("Прогноз погоды", style={"textAlign": "center", "font-family": "Roboto, sans-serif"}),
     html.Label("Выберите город:", style={"color": "#003366", "font-family": "Roboto, sans-serif"}),
     dcc.Dropdown(
@@ -66,44 +82,48 @@ app.layout = html.Div([
 ], style={"padding": "20px 100px"})
 
 
-@app.callback(
-    Output("graphs-container", "children"),
-    Input("city-dropdown", "value"),
-    Input("days-dropdown", "value"),
-    Input("graph-selector", "value")
-)
-def update_graph(selected_city: str, selected_days: str, selected_graphs: list[str]) -> list[dcc.Graph]:
-    if not selected_city or df.empty:
+def update_graph(selected_city: str, selected_days: str, selected_graphs: list[str], search: str) -> list[dcc.Graph]:
+    route_id = get_route_id(search)
+    if not selected_city or route_id is None:
         return []
-    filtered_df = get_filtered_df(selected_city, selected_days)
     graphs = []
-    if "temperature" in selected_graphs:
-        temp_graph = get_graph(filtered_df, "temperature",
-                               f"Температура в городе {selected_city}", f"Температура (°C)")
-        graphs.append(temp_graph)
-    if "humidity" in selected_graphs:
-        humidity_graph = get_graph(filtered_df, "humidity",
-                               f"Влажность в городе {selected_city}", f"Влажность (%)")
-        graphs.append(humidity_graph)
-    if "probability_of_precipitation" in selected_graphs:
-        pop_graph = get_graph(filtered_df, "probability_of_precipitation",
-                              f"Вероятность осадков в городе {selected_city}", f"Вероятность осадков (%)")
-        graphs.append(pop_graph)
+    for metric in GRAPH_LABELS:
+        if metric not in selected_graphs:
+            continue
+        fig = get_city_figure(route_id, selected_city, int(selected_days or 5), metric)
+        if fig is None:
+            return []
+        graphs.append(dcc.Graph(figure=fig, style={"width": "500px", "height": "400px"}))
     return graphs
 
 
-def get_filtered_df(city: str, days: str):
-    filtered_df = df[df["city_name"] == city]
-    filtered_df["date"] = pd.to_datetime(filtered_df["date"])
-    filtered_df["probability_of_precipitation"] = filtered_df["probability_of_precipitation"] * 100
-    if days == "1":
-        filtered_df = filtered_df.head(1)
-    elif days == "3":
-        filtered_df = filtered_df.head(3)
-    return filtered_df
+@lru_cache(maxsize=config.figure_cache_size)
+def get_city_figure(route_id: str, city: str, days: int, metric: str) -> go.Figure | None:
+    dataset = get_result_store().get(route_id)
+    if dataset is None:
+        return None
+    filtered_df = dataset.get_city_days(city, days)
+    if filtered_df is None:
+        return None
+    title, y_label = GRAPH_LABELS[metric]
+    return get_graph(filtered_df, metric, title.format(city=city), y_label)
+
+
+def get_route_id(search: str | None) -> str | None:
+    return parse_qs((search or "").lstrip("?")).get("route", [None])[0]
 
 
-def get_graph(data: pd.DataFrame, y: str, title: str, y_label: str) -> dcc.Graph:
+def get_route_dataset(search: str | None) -> "RouteDataset | None":
+    route_id = get_route_id(search)
+    if route_id is None:
+        return None
+    return get_result_store().get(route_id)
+
+
+@STAGE_DURATION.time(stage="city_figure")
+def get_graph(data: "pd.DataFrame", y: str, title: str, y_label: str) -> go.Figure:
+    import plotly.express as px
+
     fig_func = px.bar if y == "probability_of_precipitation" else px.line
     params = {
         "x": "date",
@@ -123,17 +143,29 @@ def get_graph(data: pd.DataFrame, y: str, title: str, y_label: str) -> dcc.Graph
         dtick="D1",
         tickangle=-45,
     )
-    return dcc.Graph(figure=fig, style={"width": "500px", "height": "400px"})
+    return fig
 
 
-@app.callback(
-    Output("weather-map", "figure"),
-    Input("date-dropdown", "value"),
-)
-def update_map(selected_date: str) -> go.Figure:
-    filtered_df = df[df["date"] == selected_date]
-    if filtered_df.empty:
+def update_map(selected_date: str, search: str) -> go.Figure:
+    route_id = get_route_id(search)
+    if route_id is None:
+        return go.Figure()
+    return get_map_figure(route_id, selected_date)
+
+
+@lru_cache(maxsize=config.figure_cache_size)
+def get_map_figure(route_id: str, selected_date: str) -> go.Figure:
+    dataset = get_result_store().get(route_id)
+    if dataset is None:
+        return go.Figure()
+    filtered_df = dataset.get_date(selected_date)
+    if filtered_df is None:
         return go.Figure()
+    with STAGE_DURATION.time(stage="map_figure"):
+        return make_map_figure(filtered_df, selected_date)
+
+
+def make_map_figure(filtered_df: "pd.DataFrame", selected_date: str) -> go.Figure:
     fig = go.Figure()
     fig.add_trace(go.Scattermapbox(
         lat=filtered_df["lat"],
@@ -143,10 +175,7 @@ def update_map(selected_date: str) -> go.Figure:
         marker=dict(size=10),
         name="Маршрут",
         hoverinfo="text",
-        text=[
-            f"{row["city_name"]}<br>Температура: {row["temperature"]}°C<br>Влажность: {row["humidity"]}%<br>Вероятность осадков: {row["probability_of_precipitation"] * 100}%"
-            for _, row in filtered_df.iterrows()
-        ]
+        text=filtered_df["hover_text"]
     ))
     fig.update_layout(
         mapbox=dict(
@@ -165,29 +194,66 @@ def update_map(selected_date: str) -> go.Figure:
     Output("city-dropdown", "value"),
     Output("date-dropdown", "options"),
     Output("date-dropdown", "value"),
-    Input("city-dropdown", "id")
+    Input("url", "search")
 )
-def update_dropdown_options(_) -> (list[str], str, list[str], str):
-    if df.empty:
+def update_dropdown_options(search: str) -> (list[str], str, list[str], str):
+    dataset = get_route_dataset(search)
+    if dataset is None:
         return [], None, [], None
-    unique_cities = df["city_name"].unique()
+    unique_cities = dataset.cities
     options_cities = [{"label": city, "value": city} for city in unique_cities]
     default_city_value = unique_cities[0]
 
-    unique_dates = df["date"].unique()
+    unique_dates = dataset.dates
     options_dates = [{"label": date, "value": date} for date in unique_dates]
     default_date_value = unique_dates[0]
 
     return options_cities, default_city_value, options_dates, default_date_value
 
 
+def update_route_data(search: str) -> dict | None:
+    dataset = get_route_dataset(search)
+    if dataset is None:
+        return None
+    return dataset.to_client_data()
+
+
+if config.dash_clientside:
+    # данные маршрута передаются в браузер один раз, фильтрация и графики строятся на клиенте
+    app.callback(Output("route-data", "data"), Input("url", "search"))(update_route_data)
+    app.clientside_callback(
+        ClientsideFunction(namespace="dashboard", function_name="updateGraphs"),
+        Output("graphs-container", "children"),
+        Input("city-dropdown", "value"),
+        Input("days-dropdown", "value"),
+        Input("graph-selector", "value"),
+        Input("route-data", "data")
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace="dashboard", function_name="updateMap"),
+        Output("weather-map", "figure"),
+        Input("date-dropdown", "value"),
+        Input("route-data", "data")
+    )
+else:
+    app.callback(
+        Output("graphs-container", "children"),
+        Input("city-dropdown", "value"),
+        Input("days-dropdown", "value"),
+        Input("graph-selector", "value"),
+        State("url", "search")
+    )(update_graph)
+    app.callback(
+        Output("weather-map", "figure"),
+        Input("date-dropdown", "value"),
+        State("url", "search")
+    )(update_map)
+
+
 @server.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "GET":
         return render_template("index.html")
-    if not is_connected():
-        error_message = "Нет подключения к интернету."
-        return render_template("index.html", error_message=error_message)
     cities = get_cities_from_request()
     if cities is None:
         error_message = "Пожалуйста, введите названия обоих городов."
@@ -196,12 +262,16 @@ def index():
         cities_data, error_message = get_cities_forecasts_with_coords(cities)
         if error_message:
             return render_template("index.html", error_message=error_message)
+    except UpstreamUnavailable:
+        error_message = "Сервис погоды временно недоступен. Попробуйте позже"
+        return render_template("index.html", error_message=error_message)
     except requests.RequestException:
         error_message = "Произошла ошибка во время получения данных"
         return render_template("index.html", error_message=error_message)
-    global df
-    df = pd.DataFrame(columns=list(cities_data[0].keys()), data=cities_data)
-    return redirect(url_for("dash_view"))
+    from dataset import RouteDataset
+
+    route_id = get_result_store().put(RouteDataset(cities_data))
+    return redirect(url_for("dash_view", route=route_id))
 
 
 def get_cities_from_request() -> list[str] | None:
@@ -216,15 +286,13 @@ def get_cities_from_request() -> list[str] | None:
 
 
 def get_cities_forecasts_with_coords(cities: list[str]) -> (list[dict] | None, str):
-    weather_service = WeatherService(config.api_key)
-    geocoder = Geocoder(config.api_key)
+    route_forecaster = get_route_forecaster()
     cities_data = []
-    for city in cities:
-        weather = weather_service.get_forecast_for(city, 5)
-        if weather is None:
+    for city, result in zip(cities, route_forecaster.get_forecasts_with_coords(cities, 5)):
+        if result is None:
             error_message = f"Не удалось получить данные для города: {city}"
             return None, error_message
-        lat, lon = geocoder.get_coordinates_by_city(city)
+        weather, lat, lon = result
         city_data = [{**forecast, "lat": lat, "lon": lon, "city_name": city} for forecast in weather]
         cities_data.extend(city_data)
     return cities_data, ""
@@ -235,5 +303,12 @@ def dash_view():
     return app.index()
 
 
+def preload() -> None:
+    """Загружает отложенные модули заранее. serve.py вызывает ее до fork, чтобы воркеры
+       делили эти модули с мастер-процессом, а не загружали каждый при первом запросе"""
+    for module in LAZY_MODULES:
+        import_module(module)
+
+
 if __name__ == "__main__":
     server.run(debug=True)
\ No newline at end of file
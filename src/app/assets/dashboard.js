@@ -0,0 +1,71 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        updateGraphs: function (selectedCity, selectedDays, selectedGraphs, routeData) {
+            if (!selectedCity || !routeData || !routeData.by_city[selectedCity]) {
+                return [];
+            }
+            const labels = {
+                temperature: ["Температура в городе ", "Температура (°C)"],
+                humidity: ["Влажность в городе ", "Влажность (%)"],
+                probability_of_precipitation: ["Вероятность осадков в городе ", "Вероятность осадков (%)"]
+            };
+            const cityData = routeData.by_city[selectedCity];
+            const days = parseInt(selectedDays || "5", 10);
+            const dates = cityData.date_label.slice(0, days);
+            const graphs = [];
+            for (const metric of Object.keys(labels)) {
+                if (!selectedGraphs.includes(metric)) {
+                    continue;
+                }
+                const isBar = metric === "probability_of_precipitation";
+                const trace = {x: dates, y: cityData[metric].slice(0, days), type: isBar ? "bar" : "scatter"};
+                if (!isBar) {
+                    trace.mode = "lines+markers";
+                }
+                graphs.push({
+                    namespace: "dash_core_components",
+                    type: "Graph",
+                    props: {
+                        figure: {
+                            data: [trace],
+                            layout: {
+                                title: {text: labels[metric][0] + selectedCity},
+                                xaxis: {title: {text: "Дата"}, type: "date", tickformat: "%Y-%m-%d",
+                                        dtick: 86400000, tickangle: -45},
+                                yaxis: {title: {text: labels[metric][1]}}
+                            }
+                        },
+                        style: {width: "500px", height: "400px"}
+                    }
+                });
+            }
+            return graphs;
+        },
+
+        updateMap: function (selectedDate, routeData) {
+            if (!routeData || !routeData.by_date[selectedDate]) {
+                return {data: [], layout: {}};
+            }
+            const dateData = routeData.by_date[selectedDate];
+            return {
+                data: [{
+                    type: "scattermapbox",
+                    lat: dateData.lat,
+                    lon: dateData.lon,
+                    mode: "lines+markers",
+                    line: {width: 2},
+                    marker: {size: 10},
+                    name: "Маршрут",
+                    hoverinfo: "text",
+                    text: dateData.hover_text,
+                    showlegend: true
+                }],
+                layout: {
+                    mapbox: {style: "carto-positron", zoom: 5, center: {lat: dateData.lat[0], lon: dateData.lon[0]}},
+                    showlegend: true,
+                    title: {text: "Прогноз погоды на " + selectedDate}
+                }
+            };
+        }
+    }
+});
@@ -0,0 +1,229 @@
+"""Асинхронный сервер на aiohttp: пути /api обрабатываются корутинами без блокировки потоков,
+   остальные запросы (форма и дашборд) передаются WSGI-приложению Flask в пул потоков"""
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+from multidict import CIMultiDict
+
+from config import config
+from dependencies import create_async_weather_service, get_circuit_breaker, get_gazetteer
+from routes.common import (NDJSON_MIMETYPE, UNAVAILABLE, UPSTREAM_ERRORS, ApiResponse, BadRequest, city_response,
+                           forecast_response, health_response, make_city_result_async, make_ndjson_line, parse_days,
+                           parse_limit, parse_route, suggestions_response)
+from services.async_weather import AsyncWeatherService
+from services.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, METRICS_CONTENT_TYPE, registry
+from services.profiling import PROFILE_HEADER, save_profile, start_profile, stop_profile
+
+
+weather_service_key = web.AppKey("weather_service", AsyncWeatherService)
+routes = web.RouteTableDef()
+
+
+@routes.get("/api/forecasts/{city}")
+async def get_weather(request: web.Request) -> web.Response:
+    days = parse_days(request.query.get("days", "5"))
+    try:
+        forecast = await request.app[weather_service_key].get_forecast_for(request.match_info["city"], days)
+    except UPSTREAM_ERRORS:
+        return respond(UNAVAILABLE)
+    return respond(forecast_response(forecast))
+
+
+@routes.post("/api/forecasts")
+async def get_route_weather(request: web.Request) -> web.Response:
+    cities, days = parse_route(await read_json(request), config.batch_max_cities)
+    weather_service = request.app[weather_service_key]
+    results = await asyncio.gather(*[make_city_result_async(city, weather_service.get_forecast_for(city, days))
+                                     for city in cities])
+    return web.json_response({"forecasts": results})
+
+
+@routes.post("/api/forecasts/stream")
+async def stream_route_weather(request: web.Request) -> web.StreamResponse:
+    """То же, что POST /api/forecasts, но в формате NDJSON: каждая строка - результат одного города
+       с его индексом в маршруте, отправленная сразу, как только он готов"""
+    cities, days = parse_route(await read_json(request), config.batch_max_cities)
+    weather_service = request.app[weather_service_key]
+
+    async def make_line(i: int, city: str) -> bytes:
+        return make_ndjson_line(i, await make_city_result_async(city, weather_service.get_forecast_for(city, days)))
+
+    tasks = [asyncio.ensure_future(make_line(i, city)) for i, city in enumerate(cities)]
+    response = web.StreamResponse(headers={"Content-Type": NDJSON_MIMETYPE})
+    try:
+        await response.prepare(request)
+        for task in asyncio.as_completed(tasks):
+            await response.write(await task)
+        await response.write_eof()
+    finally:
+        # клиент отключился: оставшиеся города не нужны
+        for task in tasks:
+            task.cancel()
+    return response
+
+
+@routes.get("/api/cities")
+async def suggest_cities(request: web.Request) -> web.Response:
+    limit = parse_limit(request.query.get("limit", "10"))
+    return respond(suggestions_response(get_gazetteer(), request.query.get("q", ""), limit))
+
+
+@routes.get("/api/cities/{city}")
+async def get_city(request: web.Request) -> web.Response:
+    city = request.match_info["city"]
+    try:
+        coords = await request.app[weather_service_key].get_coordinates_by_city(city)
+    except UPSTREAM_ERRORS:
+        return respond(UNAVAILABLE)
+    return respond(city_response(city, coords))
+
+
+@routes.get("/metrics")
+async def get_metrics(request: web.Request) -> web.Response:
+    # чтение снимков других воркеров - файловый ввод-вывод, поэтому вне event loop
+    body = await asyncio.to_thread(registry.render)
+    return web.Response(body=body.encode("utf-8"), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+
+@routes.get("/api/health")
+async def get_health(request: web.Request) -> web.Response:
+    return respond(health_response(get_circuit_breaker()))
+
+
+def respond(response: ApiResponse) -> web.Response:
+    body, status = response
+    return web.json_response(body, status=status)
+
+
+async def read_json(request: web.Request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+@web.middleware
+async def bad_request_middleware(request: web.Request, handler):
+    try:
+        return await handler(request)
+    except BadRequest as e:
+        return respond(e.response)
+
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler):
+    """Время и статусы ответов асинхронных путей, а также их профили (см. services/profiling.py).
+       Запросы к WSGI-приложению учитывает и профилирует само Flask-приложение.
+       Профиль асинхронного пути включает и другие корутины, выполнявшиеся в цикле событий в это время"""
+    route = request.match_info.route
+    if isinstance(route.handler, WSGIHandler):
+        return await handler(request)
+    name = route.resource.canonical if route.resource is not None else "unmatched"
+    started = time.perf_counter()
+    status = 500
+    profiler = start_profile(request.headers)
+    try:
+        response = await handler(request)
+        status = response.status
+        if profiler is not None:
+            stop_profile(profiler)
+            profile, profiler = profiler, None
+            profile_name = save_profile(profile, getattr(route.handler, "__name__", "unmatched"))
+            # у потокового ответа заголовки уже отправлены, его профиль только сохраняется
+            if not response.prepared:
+                response.headers[PROFILE_HEADER] = profile_name
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        if profiler is not None:
+            stop_profile(profiler)
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, route=name, method=request.method)
+        HTTP_REQUESTS.inc(route=name, method=request.method, status=status)
+
+
+class WSGIHandler:
+    """Выполняет WSGI-приложение в пуле потоков и отдает его ответ через aiohttp"""
+
+    def __init__(self, wsgi_app, executor: ThreadPoolExecutor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    async def __call__(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        environ = self._make_environ(request, body)
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(self.executor, self._call_app, environ)
+        return web.Response(status=status, headers=headers, body=content)
+
+    def _call_app(self, environ: dict) -> tuple[int, CIMultiDict, bytes]:
+        response = {}
+
+        def start_response(status: str, headers: list[tuple[str, str]], exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = CIMultiDict(
+                (name, value) for name, value in headers if name.lower() not in ("content-length", "transfer-encoding")
+            )
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], response["headers"], content
+
+    @staticmethod
+    def _make_environ(request: web.Request, body: bytes) -> dict:
+        host, port = (request.transport.get_extra_info("sockname") or ("", 0))[:2]
+        environ = {
+            "REQUEST_METHOD": request.method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": request.path.encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": request.query_string,
+            "CONTENT_TYPE": request.headers.get("Content-Type", ""),
+            "CONTENT_LENGTH": str(len(body)),
+            "SERVER_NAME": str(host),
+            "SERVER_PORT": str(port),
+            "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+            "REMOTE_ADDR": request.remote or "",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": request.scheme,
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in request.headers.items():
+            key = "HTTP_" + name.upper().replace("-", "_")
+            if key in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+                continue
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+
+async def weather_service_ctx(app: web.Application):
+    connector = aiohttp.TCPConnector(limit=config.async_http_limit)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        app[weather_service_key] = create_async_weather_service(session)
+        yield
+
+
+def create_app(wsgi_app=None) -> web.Application:
+    """Создает aiohttp-приложение с асинхронным API. Если передан wsgi_app,
+       все остальные пути обслуживаются им"""
+    app = web.Application(middlewares=[metrics_middleware, bad_request_middleware])
+    app.add_routes(routes)
+    app.cleanup_ctx.append(weather_service_ctx)
+    if wsgi_app is not None:
+        executor = ThreadPoolExecutor(max_workers=config.web_threads, thread_name_prefix="wsgi")
+        app.router.add_route("*", "/{tail:.*}", WSGIHandler(wsgi_app, executor))
+        app.on_cleanup.append(lambda _: asyncio.to_thread(executor.shutdown))
+    return app
@@ -8,6 +8,45 @@ class Config:
         if env_file:
             load_dotenv()
         self.api_key = os.getenv("API_KEY", "")
+        self.openweather_url = os.getenv("OPENWEATHER_URL", "http://api.openweathermap.org")
+        self.geocoder_cache_size = int(os.getenv("GEOCODER_CACHE_SIZE", 1024))
+        self.geocoder_cache_ttl = float(os.getenv("GEOCODER_CACHE_TTL", 30 * 24 * 3600))
+        self.geocoder_negative_cache_ttl = float(os.getenv("GEOCODER_NEGATIVE_CACHE_TTL", 3600))
+        self.geocoder_cache_path = os.getenv("GEOCODER_CACHE_PATH") or None
+        self.geocoder_cache_save_interval = float(os.getenv("GEOCODER_CACHE_SAVE_INTERVAL", 30))
+        self.gazetteer_path = os.getenv("GAZETTEER_PATH") or None
+        self.forecast_cache_size = int(os.getenv("FORECAST_CACHE_SIZE", 512))
+        self.forecast_cache_bucket = int(os.getenv("FORECAST_CACHE_BUCKET", 3 * 3600))
+        self.forecast_cache_precision = int(os.getenv("FORECAST_CACHE_PRECISION", 2))
+        self.http_pool_size = int(os.getenv("HTTP_POOL_SIZE", 10))
+        self.http_retries = int(os.getenv("HTTP_RETRIES", 3))
+        self.http_backoff = float(os.getenv("HTTP_BACKOFF", 0.5))
+        self.http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3))
+        self.http_read_timeout = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+        self.breaker_failure_threshold = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+        self.breaker_reset_timeout = float(os.getenv("BREAKER_RESET_TIMEOUT", 30))
+        self.route_concurrency = int(os.getenv("ROUTE_CONCURRENCY", 8))
+        self.batch_max_cities = int(os.getenv("BATCH_MAX_CITIES", 30))
+        self.result_store = os.getenv("RESULT_STORE", "memory")
+        self.result_store_path = os.getenv("RESULT_STORE_PATH", "results.sqlite3")
+        self.result_store_ttl = float(os.getenv("RESULT_STORE_TTL", 3600))
+        self.result_store_max_entries = int(os.getenv("RESULT_STORE_MAX_ENTRIES", 256))
+        self.result_store_local_size = int(os.getenv("RESULT_STORE_LOCAL_SIZE", 16))
+        self.web_host = os.getenv("WEB_HOST", "127.0.0.1")
+        self.web_port = int(os.getenv("WEB_PORT", 5000))
+        self.web_workers = int(os.getenv("WEB_WORKERS", 1))
+        self.web_mode = os.getenv("WEB_MODE", "full")
+        self.web_threads = int(os.getenv("WEB_THREADS", 16))
+        self.restart_backoff = float(os.getenv("RESTART_BACKOFF", 0.5))
+        self.restart_backoff_max = float(os.getenv("RESTART_BACKOFF_MAX", 30))
+        self.restart_reset_after = float(os.getenv("RESTART_RESET_AFTER", 60))
+        self.async_http_limit = int(os.getenv("ASYNC_HTTP_LIMIT", 100))
+        self.metrics_dir = os.getenv("METRICS_DIR") or None
+        self.metrics_flush_interval = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+        self.profile_mode = os.getenv("PROFILE_MODE", "off")
+        self.profile_dir = os.getenv("PROFILE_DIR", "profiles")
+        self.figure_cache_size = int(os.getenv("FIGURE_CACHE_SIZE", 512))
+        self.dash_clientside = os.getenv("DASH_CLIENTSIDE", "0").lower() in ("1", "true", "yes")
 
 
-config = Config()
\ No newline at end of file
+config = Config()
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from services.metrics import STAGE_DURATION
+
+
+class RouteDataset:
+    """Прогноз маршрута, один раз подготовленный для Dash: даты разобраны, осадки в процентах,
+       текст подсказок для карты посчитан, строки сгруппированы по городам и по датам"""
+
+    @STAGE_DURATION.time(stage="dataframe")
+    def __init__(self, cities_data: list[dict]):
+        df = pd.DataFrame(columns=list(cities_data[0].keys()), data=cities_data)
+        self.cities = list(dict.fromkeys(df["city_name"]))
+        self.dates = list(dict.fromkeys(df["date"]))
+
+        df["date_label"] = df["date"]
+        df["probability_of_precipitation"] = df["probability_of_precipitation"] * 100
+        df["hover_text"] = (
+            df["city_name"] + "<br>Температура: " + df["temperature"].astype(str)
+            + "°C<br>Влажность: " + df["humidity"].astype(str)
+            + "%<br>Вероятность осадков: " + df["probability_of_precipitation"].astype(str) + "%"
+        )
+        df["city_name"] = pd.Categorical(df["city_name"], categories=self.cities)
+        df["date"] = pd.to_datetime(df["date"])
+        self.df = df
+
+        self.by_city = {city: city_df.reset_index(drop=True)
+                        for city, city_df in df.groupby("city_name", observed=True, sort=False)}
+        self.by_date = {date: date_df.reset_index(drop=True)
+                        for date, date_df in df.groupby("date_label", sort=False)}
+
+    def get_city_days(self, city: str, days: int) -> pd.DataFrame | None:
+        city_df = self.by_city.get(city)
+        if city_df is None:
+            return None
+        return city_df.iloc[:days]
+
+    def get_date(self, date: str) -> pd.DataFrame | None:
+        return self.by_date.get(date)
+
+    def to_client_data(self) -> dict:
+        """Компактное представление маршрута для dcc.Store: столбцы по городам и по датам"""
+        return {
+            "cities": self.cities,
+            "dates": self.dates,
+            "by_city": {
+                city: {column: city_df[column].tolist() for column in
+                       ("date_label", "temperature", "humidity", "probability_of_precipitation")}
+                for city, city_df in self.by_city.items()
+            },
+            "by_date": {
+                date: {column: date_df[column].tolist() for column in ("lat", "lon", "hover_text")}
+                for date, date_df in self.by_date.items()
+            },
+        }
@@ -0,0 +1,91 @@
+from typing import TYPE_CHECKING
+
+from config import config
+from services.cache import CoordinatesCache, ForecastCache
+from services.gazetteer import Gazetteer, load_gazetteer
+from services.geocoder import Geocoder
+from services.health import CircuitBreaker
+from services.http import create_session
+from services.route import RouteForecaster
+from services.weather import WeatherService
+from stores import ResultStore, create_result_store
+
+if TYPE_CHECKING:
+    import aiohttp
+    from services.async_weather import AsyncWeatherService
+
+
+coords_cache = CoordinatesCache(
+    max_size=config.geocoder_cache_size,
+    ttl=config.geocoder_cache_ttl,
+    negative_ttl=config.geocoder_negative_cache_ttl,
+    path=config.geocoder_cache_path,
+    save_interval=config.geocoder_cache_save_interval
+)
+gazetteer = load_gazetteer(config.gazetteer_path)
+forecast_cache = ForecastCache(
+    max_size=config.forecast_cache_size,
+    bucket_seconds=config.forecast_cache_bucket,
+    precision=config.forecast_cache_precision
+)
+circuit_breaker = CircuitBreaker(
+    failure_threshold=config.breaker_failure_threshold,
+    reset_timeout=config.breaker_reset_timeout
+)
+http_session = create_session(
+    pool_size=config.http_pool_size,
+    retries=config.http_retries,
+    backoff_factor=config.http_backoff,
+    breaker=circuit_breaker
+)
+http_timeout = (config.http_connect_timeout, config.http_read_timeout)
+
+geocoder = Geocoder(config.api_key, cache=coords_cache, session=http_session, timeout=http_timeout,
+                    gazetteer=gazetteer, base_url=config.openweather_url)
+weather_service = WeatherService(config.api_key, geocoder=geocoder, forecast_cache=forecast_cache,
+                                 session=http_session, timeout=http_timeout, base_url=config.openweather_url)
+route_forecaster = RouteForecaster(weather_service, max_workers=config.route_concurrency)
+result_store = create_result_store(
+    backend=config.result_store,
+    path=config.result_store_path,
+    ttl=config.result_store_ttl,
+    max_entries=config.result_store_max_entries,
+    local_size=config.result_store_local_size
+)
+
+
+def create_async_weather_service(session: "aiohttp.ClientSession") -> "AsyncWeatherService":
+    """Асинхронный сервис поверх общих кэшей и CircuitBreaker. Сессия создается внутри event loop воркера.
+       aiohttp загружается только асинхронным сервером"""
+    from services.async_weather import AsyncWeatherService
+
+    return AsyncWeatherService(weather_service, session, breaker=circuit_breaker,
+                               retries=config.http_retries, backoff_factor=config.http_backoff)
+
+
+def get_coordinates_cache() -> CoordinatesCache:
+    return coords_cache
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    return circuit_breaker
+
+
+def get_gazetteer() -> Gazetteer | None:
+    return gazetteer
+
+
+def get_geocoder() -> Geocoder:
+    return geocoder
+
+
+def get_weather_service() -> WeatherService:
+    return weather_service
+
+
+def get_route_forecaster() -> RouteForecaster:
+    return route_forecaster
+
+
+def get_result_store() -> ResultStore:
+    return result_store
@@ -1,24 +1,84 @@
-from flask import Blueprint, request, jsonify
+from concurrent.futures import as_completed
+
+from flask import Blueprint, Response, request, jsonify
 
-from services.weather import WeatherService
 from config import config
-from requests import RequestException
+from dependencies import (get_circuit_breaker, get_gazetteer, get_geocoder, get_weather_service,
+                          get_route_forecaster)
+from routes.common import (NDJSON_MIMETYPE, UNAVAILABLE, UPSTREAM_ERRORS, ApiResponse, BadRequest, city_response,
+                           forecast_response, health_response, make_city_result, make_ndjson_line, parse_days,
+                           parse_limit, parse_route, suggestions_response)
 
 
 router = Blueprint("api", __name__)
 
 
+def respond(response: ApiResponse):
+    body, status = response
+    return jsonify(body), status
+
+
+@router.errorhandler(BadRequest)
+def handle_bad_request(e: BadRequest):
+    return respond(e.response)
+
+
 @router.route("/forecasts/<string:city>", methods=["GET"])
 def get_weather(city: str):
-    days = request.args.get("days", 5)
-    if not days or not days.isdigit() or not (1 <= int(days) <= 5):
-        return jsonify({"reason": "Bad time interval provided. Must be a number between 1 and 5"}), 400
+    days = parse_days(request.args.get("days", "5"))
+    try:
+        forecast = get_weather_service().get_forecast_for(city, days)
+    except UPSTREAM_ERRORS:
+        return respond(UNAVAILABLE)
+    return respond(forecast_response(forecast))
+
+
+@router.route("/forecasts", methods=["POST"])
+def get_route_weather():
+    """Принимает {"cities": [...], "days": n} и возвращает прогноз или ошибку для каждого города в порядке маршрута"""
+    cities, days = parse_route(request.get_json(silent=True), config.batch_max_cities)
+    futures = get_route_forecaster().submit_forecasts(cities, days)
+    return jsonify({"forecasts": [make_city_result(city, future.result) for city, future in zip(cities, futures)]})
+
 
-    weather_service = WeatherService(config.api_key)
+@router.route("/forecasts/stream", methods=["POST"])
+def stream_route_weather():
+    """То же, что POST /forecasts, но в формате NDJSON: каждая строка - результат одного города
+       с его индексом в маршруте, в порядке готовности, а не в порядке маршрута"""
+    cities, days = parse_route(request.get_json(silent=True), config.batch_max_cities)
+    futures = get_route_forecaster().submit_forecasts(cities, days)
+    indexes = {future: i for i, future in enumerate(futures)}
+
+    def generate():
+        try:
+            for future in as_completed(futures):
+                i = indexes[future]
+                yield make_ndjson_line(i, make_city_result(cities[i], future.result))
+        finally:
+            # клиент отключился: оставшиеся города не нужны
+            for future in futures:
+                future.cancel()
+
+    return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+
+@router.route("/cities", methods=["GET"])
+def suggest_cities():
+    """Автодополнение названий городов по локальному справочнику: ?q=<начало названия>&limit=<до 20>"""
+    limit = parse_limit(request.args.get("limit", "10"))
+    return respond(suggestions_response(get_gazetteer(), request.args.get("q", ""), limit))
+
+
+@router.route("/cities/<string:city>", methods=["GET"])
+def get_city(city: str):
+    """Быстрая проверка существования города: только геокодирование, без прогноза"""
     try:
-        forecast = weather_service.get_forecast_for(city, int(days))
-    except RequestException:
-        return jsonify({"reason": "External service unavailable"}), 503
-    if not forecast:
-        return jsonify({"reason": "Not found"}), 404
-    return forecast
+        coords = get_geocoder().get_coordinates_by_city(city)
+    except UPSTREAM_ERRORS:
+        return respond(UNAVAILABLE)
+    return respond(city_response(city, coords))
+
+
+@router.route("/health", methods=["GET"])
+def get_health():
+    return respond(health_response(get_circuit_breaker()))
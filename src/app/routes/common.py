@@ -0,0 +1,122 @@
+"""Разбор запросов и формирование ответов JSON API, общие для Flask (routes/api_routes.py)
+   и асинхронного сервера (async_server.py). Обработчики фреймворков только получают данные
+   и отдают ответ (тело, статус) в своем формате"""
+import json
+from typing import Any, Awaitable, Callable
+
+from requests import RequestException
+
+from services.gazetteer import Gazetteer
+from services.health import CircuitBreaker
+from services.http import UpstreamError
+
+
+MAX_SUGGESTIONS = 20
+NDJSON_MIMETYPE = "application/x-ndjson"
+# ошибки получения данных от OpenWeather в синхронном и асинхронном путях
+UPSTREAM_ERRORS = (RequestException, UpstreamError)
+
+ApiResponse = tuple[Any, int]
+
+UNAVAILABLE: ApiResponse = ({"reason": "External service unavailable"}, 503)
+NOT_FOUND: ApiResponse = ({"reason": "Not found"}, 404)
+
+
+class BadRequest(ValueError):
+    """Некорректный запрос; response - ответ 400 с причиной отказа"""
+
+    @property
+    def response(self) -> ApiResponse:
+        return {"reason": str(self)}, 400
+
+
+def is_valid_days(days: str) -> bool:
+    return days.isdigit() and 1 <= int(days) <= 5
+
+
+def parse_days(days: str) -> int:
+    if not is_valid_days(days):
+        raise BadRequest("Bad time interval provided. Must be a number between 1 and 5")
+    return int(days)
+
+
+def parse_limit(limit: str) -> int:
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_SUGGESTIONS:
+        raise BadRequest(f"Bad limit provided. Must be a number between 1 and {MAX_SUGGESTIONS}")
+    return int(limit)
+
+
+def get_route_error(body, max_cities: int) -> str | None:
+    """Причина отказа для тела запроса маршрута {"cities": [...], "days": n} или None, если оно корректно"""
+    if not isinstance(body, dict):
+        body = {}
+    if not is_valid_days(str(body.get("days", "5"))):
+        return "Bad time interval provided. Must be a number between 1 and 5"
+    cities = body.get("cities")
+    if (not isinstance(cities, list) or not cities or len(cities) > max_cities
+            or not all(isinstance(city, str) and city.strip() for city in cities)):
+        return f"Bad cities provided. Must be a list of 1 to {max_cities} names"
+    return None
+
+
+def parse_route(body, max_cities: int) -> tuple[list[str], int]:
+    """Города и число дней из тела запроса маршрута. Выбрасывает BadRequest, если тело некорректно"""
+    reason = get_route_error(body, max_cities)
+    if reason is not None:
+        raise BadRequest(reason)
+    return body["cities"], int(body.get("days", 5))
+
+
+def forecast_response(forecast: list | None) -> ApiResponse:
+    if not forecast:
+        return NOT_FOUND
+    return forecast, 200
+
+
+def city_response(city: str, coords: tuple[float, float] | None) -> ApiResponse:
+    if coords is None:
+        return NOT_FOUND
+    lat, lon = coords
+    return {"city": city, "lat": lat, "lon": lon}, 200
+
+
+def suggestions_response(gazetteer: Gazetteer | None, prefix: str, limit: int) -> ApiResponse:
+    if gazetteer is None:
+        return {"cities": []}, 200
+    return {"cities": gazetteer.search_prefix(prefix, limit)}, 200
+
+
+def health_response(breaker: CircuitBreaker) -> ApiResponse:
+    return {"upstream": breaker.state, "upstream_available": breaker.is_available()}, 200
+
+
+def city_result(city: str, forecast: list | None) -> dict:
+    """Результат одного города в ответе маршрута"""
+    body, status = forecast_response(forecast)
+    if status != 200:
+        return {"city": city, "status": status, **body}
+    return {"city": city, "status": status, "forecast": body}
+
+
+def unavailable_city_result(city: str) -> dict:
+    body, status = UNAVAILABLE
+    return {"city": city, "status": status, **body}
+
+
+def make_city_result(city: str, get_forecast: Callable[[], list | None]) -> dict:
+    try:
+        return city_result(city, get_forecast())
+    except UPSTREAM_ERRORS:
+        return unavailable_city_result(city)
+
+
+async def make_city_result_async(city: str, forecast: Awaitable[list | None]) -> dict:
+    try:
+        return city_result(city, await forecast)
+    except UPSTREAM_ERRORS:
+        return unavailable_city_result(city)
+
+
+def make_ndjson_line(index: int, result: dict) -> bytes:
+    """Строка потокового ответа маршрута: результат города с его индексом в маршруте"""
+    return json.dumps({"index": index, **result}, ensure_ascii=False).encode("utf-8") + b"\n"
@@ -0,0 +1,163 @@
+"""Запуск веб-сервиса вместо отладочного сервера Flask: асинхронный API и форма с дашбордом
+   в нескольких процессах-воркерах, принимающих соединения с общего сокета.
+       python serve.py --workers 4 --port 5000
+   С --mode api запускается только JSON API, без формы, Dash, pandas и plotly.
+   Для нескольких воркеров нужно общее хранилище маршрутов (RESULT_STORE=sqlite)"""
+import argparse
+import asyncio
+import atexit
+import logging
+import os
+import select
+import signal
+import socket
+import tempfile
+import time
+
+from aiohttp import web
+
+from async_server import create_app
+from config import config
+from dependencies import get_coordinates_cache
+from services.metrics import clear_multiprocess_dir, registry
+
+
+logger = logging.getLogger(__name__)
+
+PARENT_CHECK_INTERVAL = 1
+
+
+def create_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+    return sock
+
+
+def load_wsgi_app(mode: str):
+    """Flask-приложение с формой и дашбордом для режима full, None для режима api"""
+    if mode == "api":
+        return None
+    if mode != "full":
+        raise ValueError(f"Unknown web mode: {mode}")
+    import app
+
+    app.preload()
+    return app.server
+
+
+def run_worker(sock: socket.socket, wsgi_app=None, parent_pid: int | None = None,
+               metrics_dir: str | None = None) -> None:
+    app = create_app(wsgi_app)
+    # воркеры завершаются через os._exit без atexit, поэтому найденные координаты сохраняются здесь
+    app.on_cleanup.append(lambda _: asyncio.to_thread(get_coordinates_cache().save))
+    if metrics_dir is not None:
+        registry.enable_multiprocess(metrics_dir, config.metrics_flush_interval)
+        # последние значения остановленного воркера продолжают учитываться в /metrics
+        app.on_cleanup.append(lambda _: asyncio.to_thread(registry.write_snapshot))
+    if parent_pid is not None:
+        async def parent_watch_ctx(app: web.Application):
+            task = asyncio.create_task(watch_parent(parent_pid))
+            yield
+            task.cancel()
+
+        app.cleanup_ctx.append(parent_watch_ctx)
+    web.run_app(app, sock=sock, print=None, access_log=None)
+
+
+async def watch_parent(parent_pid: int) -> None:
+    """Останавливает воркер, если мастер-процесс завершился, не остановив его (например, по SIGKILL),
+       чтобы воркер не держал порт и перезапущенный сервис смог его занять"""
+    while os.getppid() == parent_pid:
+        await asyncio.sleep(PARENT_CHECK_INTERVAL)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def serve(host: str, port: int, workers: int, mode: str = "full") -> None:
+    """Тяжелые модули загружаются до fork, поэтому воркеры стартуют сразу и делят их память"""
+    wsgi_app = load_wsgi_app(mode)
+    sock = create_socket(host, port)
+    logger.info("Serving %s on http://%s:%d with %d worker(s)", mode, host, port, workers)
+    if workers == 1 or not hasattr(os, "fork"):
+        run_worker(sock, wsgi_app)
+        return
+    # мастер не обслуживает запросы: при выходе он записал бы поверх файла кэш координат,
+    # загруженный при старте, без координат, найденных воркерами
+    atexit.unregister(get_coordinates_cache().save)
+    if wsgi_app is not None and config.result_store == "memory":
+        logger.warning("RESULT_STORE=memory is not shared between workers, dashboard links may not open")
+
+    # без общей папки /metrics показывал бы только значения ответившего воркера
+    metrics_dir = config.metrics_dir or tempfile.mkdtemp(prefix="weather-metrics-")
+    clear_multiprocess_dir(metrics_dir)
+    supervise_workers(sock, workers, wsgi_app, metrics_dir)
+
+
+def supervise_workers(sock: socket.socket, workers: int, wsgi_app=None, metrics_dir: str | None = None) -> None:
+    """Держит заданное число воркеров: упавший воркер перезапускается с экспоненциальной задержкой,
+       SIGTERM и SIGINT передаются воркерам для корректной остановки"""
+    children: dict[int, float] = {}
+    stopping = False
+    # обработчик сигнала прерывает ожидание перед перезапуском воркера записью в pipe. threading.Event не подходит:
+    # обработчик выполняется в том же потоке и может зависнуть на блокировке, которую держит Event.wait
+    wakeup_r, wakeup_w = os.pipe()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        os.write(wakeup_w, b"\0")
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        children[spawn_worker(sock, wsgi_app, metrics_dir)] = time.monotonic()
+
+    failures = 0
+    while children:
+        pid, status = os.wait()
+        started_at = children.pop(pid, None)
+        if started_at is None or stopping:
+            continue
+        # воркер, проработавший долго, упал не из-за ошибки запуска: задержка начинается заново
+        if time.monotonic() - started_at > config.restart_reset_after:
+            failures = 0
+        failures += 1
+        delay = min(config.restart_backoff * 2 ** (failures - 1), config.restart_backoff_max)
+        logger.warning("Worker %d exited with code %d, restarting in %.1fs",
+                       pid, os.waitstatus_to_exitcode(status), delay)
+        select.select([wakeup_r], [], [], delay)
+        if not stopping:
+            children[spawn_worker(sock, wsgi_app, metrics_dir)] = time.monotonic()
+
+
+def spawn_worker(sock: socket.socket, wsgi_app=None, metrics_dir: str | None = None) -> int:
+    parent_pid = os.getpid()
+    pid = os.fork()
+    if pid != 0:
+        return pid
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        run_worker(sock, wsgi_app, parent_pid, metrics_dir)
+    except BaseException:
+        logger.exception("Worker %d failed", os.getpid())
+        os._exit(1)
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Веб-сервис прогноза погоды")
+    parser.add_argument("--host", default=config.web_host)
+    parser.add_argument("--port", type=int, default=config.web_port)
+    parser.add_argument("--workers", type=int, default=config.web_workers)
+    parser.add_argument("--mode", choices=("full", "api"), default=config.web_mode)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    serve(args.host, args.port, args.workers, args.mode)
@@ -0,0 +1,84 @@
+from statistics import mean
+
+import numpy as np
+
+
+MEAN_METRICS = (
+    ("temperature", ("main", "temp"), 1),
+    ("wind_speed", ("wind", "speed"), 1),
+    ("humidity", ("main", "humidity"), None),
+)
+TIE_TOLERANCE = 1e-9
+
+
+def aggregate_daily_forecasts(hourly_forecasts: list[list]) -> list[list[dict]]:
+    """Сводит 3-часовые прогнозы нескольких городов в дневные за один проход.
+       Для каждого города возвращает список дней с temperature, wind_speed,
+       probability_of_precipitation, humidity и date. Как и раньше, день начинается
+       с записи на 00:00:00, а последний (неполный) день отбрасывается"""
+    entries = [entry for hourly_forecast in hourly_forecasts for entry in hourly_forecast]
+    if not entries:
+        return [[] for _ in hourly_forecasts]
+
+    lengths = np.fromiter((len(hourly_forecast) for hourly_forecast in hourly_forecasts),
+                          dtype=np.int64, count=len(hourly_forecasts))
+    city_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    dt_txt = [entry["dt_txt"] for entry in entries]
+    is_midnight = np.fromiter((dt.endswith("00:00:00") for dt in dt_txt), dtype=bool, count=len(entries))
+
+    is_group_start = is_midnight.copy()
+    is_group_start[city_starts[lengths > 0]] = True
+    group_starts = np.flatnonzero(is_group_start)
+    group_ends = np.append(group_starts[1:], len(entries))
+    group_cities = np.searchsorted(city_starts, group_starts, side="right") - 1
+    # последний день каждого города не закрыт следующей полуночью и не попадает в прогноз
+    is_complete = np.append(group_cities[1:] == group_cities[:-1], False)
+    counts = group_ends - group_starts
+
+    columns = {}
+    for name, (section, key), ndigits in MEAN_METRICS:
+        values = [entry[section][key] for entry in entries]
+        array = np.asarray(values, dtype=np.float64)
+        means = np.add.reduceat(array, group_starts) / counts
+        columns[name] = _round_means(means, ndigits, values, group_starts, group_ends)
+    columns["probability_of_precipitation"] = _first_max(
+        [entry["pop"] for entry in entries], group_starts, group_ends
+    )
+
+    daily_forecasts = [[] for _ in hourly_forecasts]
+    for group in np.flatnonzero(is_complete):
+        daily_forecasts[group_cities[group]].append({
+            "temperature": columns["temperature"][group],
+            "wind_speed": columns["wind_speed"][group],
+            "probability_of_precipitation": columns["probability_of_precipitation"][group],
+            "humidity": columns["humidity"][group],
+            "date": dt_txt[group_starts[group]].split()[0],
+        })
+    return daily_forecasts
+
+
+def _round_means(means: np.ndarray, ndigits: int | None, values: list,
+                 group_starts: np.ndarray, group_ends: np.ndarray) -> list:
+    """Округляет средние как round(mean(...), ndigits). Средние, близкие к границе округления,
+       и средние целых чисел пересчитываются через statistics.mean, чтобы результат совпадал до бита и типа"""
+    scale = 10 ** (ndigits or 0)
+    fraction = np.abs(means * scale) % 1
+    # вблизи нуля важен и знак: round(-0.01, 1) == -0.0
+    near_tie = (np.abs(fraction - 0.5) < TIE_TOLERANCE) | (np.abs(means) < TIE_TOLERANCE)
+    # mean() от целых чисел с целым результатом возвращает int, а не float
+    is_int = np.fromiter((type(value) is int for value in values), dtype=bool, count=len(values))
+    is_int_mean = np.logical_and.reduceat(is_int, group_starts) & (means % 1 == 0)
+    result = means.tolist()
+    for group in np.flatnonzero(near_tie | is_int_mean):
+        result[group] = mean(values[group_starts[group]:group_ends[group]])
+    return [round(value, ndigits) for value in result]
+
+
+def _first_max(values: list, group_starts: np.ndarray, group_ends: np.ndarray) -> list:
+    """Возвращает первый максимальный элемент каждой группы (как max), сохраняя исходный тип значения"""
+    array = np.asarray(values, dtype=np.float64)
+    maxima = np.maximum.reduceat(array, group_starts)
+    positions = np.arange(len(values))
+    is_max = array == np.repeat(maxima, group_ends - group_starts)
+    first_positions = np.minimum.reduceat(np.where(is_max, positions, len(values)), group_starts)
+    return [values[position] for position in first_positions]
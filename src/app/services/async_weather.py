@@ -0,0 +1,145 @@
+import asyncio
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from services.cache import AsyncSingleFlight, normalize_city
+from services.health import CircuitBreaker
+from services.http import UpstreamError
+from services.metrics import STAGE_DURATION, UPSTREAM_REQUEST_DURATION, UPSTREAM_REQUESTS
+from services.weather import WeatherService
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class AsyncWeatherService:
+    """Асинхронный путь получения прогноза для aiohttp-сервера. Использует те же кэши, справочник городов,
+       CircuitBreaker и агрегацию, что и WeatherService, но запросы к OpenWeather не занимают поток.
+       Одновременные запросы одного города объединяются в один"""
+
+    def __init__(self, weather_service: WeatherService, session: aiohttp.ClientSession,
+                 breaker: CircuitBreaker | None = None, retries: int = 3, backoff_factor: float = 0.5):
+        self.weather_service = weather_service
+        self.geocoder = weather_service.geocoder
+        self.session = session
+        self.geocoding_url = f"{self.geocoder.base_url}/geo/1.0/direct"
+        self.forecast_url = f"{weather_service.base_url}/data/2.5/forecast"
+        self.breaker = breaker
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        connect_timeout, read_timeout = weather_service.timeout
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self._coords_flight = AsyncSingleFlight()
+        self._forecast_flight = AsyncSingleFlight()
+
+    async def get_forecast_for(self, city: str, days: int) -> list | None:
+        if not (1 <= days <= 5):
+            raise ValueError("Количество дней должно быть от 1 до 5")
+        hourly_forecast = await self._get_3hourly_5days_forecast(city)
+        if not hourly_forecast:
+            return None
+        return self.weather_service.make_daily_forecasts([hourly_forecast])[0][:days]
+
+    async def get_coordinates_by_city(self, city: str) -> tuple[float, float] | None:
+        with STAGE_DURATION.time(stage="geocoding"):
+            return await self._get_coordinates_by_city(city)
+
+    async def _get_coordinates_by_city(self, city: str) -> tuple[float, float] | None:
+        if self.geocoder.gazetteer is not None:
+            coords = self.geocoder.gazetteer.get_coordinates(city)
+            if coords is not None:
+                return coords
+        if self.geocoder.cache is not None:
+            found, coords = self.geocoder.cache.get(city)
+            if found:
+                return coords
+        return await self._coords_flight.do(normalize_city(city), lambda: self._request_coordinates(city))
+
+    async def _request_coordinates(self, city: str) -> tuple[float, float] | None:
+        r_json = await self._get_json(self.geocoding_url, {"q": city, "appid": self.geocoder.api_key, "limit": 5})
+        coords = (r_json[0]["lat"], r_json[0]["lon"]) if r_json else None
+        if self.geocoder.cache is not None:
+            self.geocoder.cache.set(city, coords)
+        return coords
+
+    async def _get_3hourly_5days_forecast(self, city: str) -> list | None:
+        coords = await self.get_coordinates_by_city(city)
+        if coords is None:
+            return None
+        lat, lon = coords
+        with STAGE_DURATION.time(stage="forecast_fetch"):
+            forecast_cache = self.weather_service.forecast_cache
+            if forecast_cache is not None:
+                forecast = forecast_cache.get(lat, lon)
+                if forecast is not None:
+                    return forecast
+            return await self._forecast_flight.do(coords, lambda: self._request_forecast(lat, lon))
+
+    async def _request_forecast(self, lat: float, lon: float) -> list:
+        r_json = await self._get_json(self.forecast_url, {
+            "appid": self.weather_service.api_key,
+            "lang": "ru",
+            "units": "metric",
+            "lat": lat,
+            "lon": lon
+        })
+        forecast = r_json["list"]
+        if self.weather_service.forecast_cache is not None:
+            self.weather_service.forecast_cache.set(lat, lon, forecast)
+        return forecast
+
+    async def _get_json(self, url: str, params: dict) -> Any:
+        """GET с повторами при 429/5xx и ошибках сети. Итог запроса сообщается в CircuitBreaker
+           так же, как в CircuitBreakerAdapter синхронной сессии"""
+        path = urlsplit(url).path
+        if self.breaker is not None and not self.breaker.allow_request():
+            UPSTREAM_REQUESTS.inc(path=path, status="unavailable")
+            raise UpstreamError("Upstream is marked as unavailable")
+        started = time.perf_counter()
+        status = None
+        try:
+            status, r_json = await self._get_with_retries(url, params)
+        except Exception as e:
+            # в том числе некорректный JSON в ответе: для вызывающего это та же недоступность сервиса
+            UPSTREAM_REQUESTS.inc(path=path, status="error")
+            raise UpstreamError(f"Upstream request failed: {e!r}") from e
+        finally:
+            UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - started, path=path)
+            # итог сообщается при любом исходе, включая отмену: иначе пробный запрос полуоткрытой цепи
+            # не закрыл бы и не открыл ее снова
+            self._record_result(status is not None and status < 500)
+        UPSTREAM_REQUESTS.inc(path=path, status=str(status))
+        if status >= 400:
+            raise UpstreamError(f"Upstream responded with {status}")
+        return r_json
+
+    async def _get_with_retries(self, url: str, params: dict) -> tuple[int, Any]:
+        for attempt in range(self.retries + 1):
+            is_last_attempt = attempt == self.retries
+            try:
+                async with self.session.get(url, params=params, timeout=self.timeout) as r:
+                    if r.status not in RETRY_STATUSES or is_last_attempt:
+                        return r.status, await r.json() if r.status < 400 else None
+                    delay = self._get_retry_delay(attempt, r.headers.get("Retry-After"))
+            except (aiohttp.ClientError, TimeoutError):
+                if is_last_attempt:
+                    raise
+                delay = self._get_retry_delay(attempt, None)
+            await asyncio.sleep(delay)
+
+    def _get_retry_delay(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        # как в urllib3 Retry: первый повтор сразу, дальше экспоненциально
+        return 0 if attempt == 0 else self.backoff_factor * 2 ** attempt
+
+    def _record_result(self, success: bool) -> None:
+        if self.breaker is None:
+            return
+        if success:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
@@ -0,0 +1,300 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from services.metrics import CACHE_LOOKUPS
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: без блокировки между процессами, одновременные сохранения могут потерять часть записей
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_city(city: str) -> str:
+    """Приводит название города к ключу кэша: NFKC, регистр, лишние пробелы"""
+    city = unicodedata.normalize("NFKC", city)
+    return " ".join(city.split()).casefold()
+
+
+class SingleFlight:
+    """Объединяет одновременные вызовы с одинаковым ключом: функция выполняется один раз,
+       остальные потоки ждут и получают тот же результат (или то же исключение)"""
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error: BaseException | None = None
+
+    def __init__(self):
+        self._calls: dict[Hashable, SingleFlight._Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._Call()
+                self._calls[key] = call
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """То же, что SingleFlight, для корутин одного event loop. Отмена ожидающего
+       не отменяет общий запрос, которого ждут остальные"""
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._on_done(key, call))
+        return await asyncio.shield(call)
+
+    def _on_done(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # ошибку получают ожидающие; здесь она только помечается полученной
+            call.exception()
+
+
+class CoordinatesCache:
+    """Потокобезопасный LRU-кэш координат городов с TTL.
+       Отсутствующие города (None) кэшируются отдельно на negative_ttl секунд, 0 - не кэшировать.
+       Если указан path, кэш загружается из JSON-файла и сохраняется в него не чаще раза в save_interval секунд
+       и при выходе. Сохранение дописывает записи к файлу, а не заменяет его, поэтому несколько процессов
+       с общим файлом не затирают записи друг друга"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 30 * 24 * 3600,
+                 negative_ttl: float = 0, path: str | None = None, save_interval: float = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.path = path
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[tuple[float, float] | None, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._flight = SingleFlight()
+        if path:
+            self._load()
+            atexit.register(self.save)
+
+    def get(self, city: str) -> tuple[bool, tuple[float, float] | None]:
+        """Возвращает (найдено ли в кэше, координаты или None)"""
+        key = normalize_city(city)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                CACHE_LOOKUPS.inc(cache="coordinates", result="miss")
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.inc(cache="coordinates", result="hit")
+            return True, entry[0]
+
+    def get_or_fetch(self, city: str, fetch: Callable[[], tuple[float, float] | None]) -> tuple[float, float] | None:
+        """Возвращает координаты из кэша, иначе вызывает fetch (один раз на все одновременные запросы)"""
+        found, coords = self.get(city)
+        if found:
+            return coords
+        return self._flight.do(normalize_city(city), lambda: self._fetch_and_set(city, fetch))
+
+    def _fetch_and_set(self, city: str, fetch: Callable[[], tuple[float, float] | None]) -> tuple[float, float] | None:
+        coords = fetch()
+        self.set(city, coords)
+        return coords
+
+    def set(self, city: str, coords: tuple[float, float] | None) -> None:
+        ttl = self.ttl if coords is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        key = normalize_city(city)
+        with self._lock:
+            self._data[key] = (coords, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            if not self.path or coords is None:
+                return
+            self._dirty = True
+            if time.monotonic() - self._saved_at < self.save_interval:
+                return
+            # следующие set не запускают сохранение, пока идет это
+            self._saved_at = time.monotonic()
+        self.save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def save(self) -> None:
+        """Сохраняет найденные координаты в файл, объединяя их с уже сохраненными.
+           Ошибка записи только логируется: кэш на диске не должен ломать запросы"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = False
+                self._saved_at = time.monotonic()
+                now = time.time()
+                data = {key: [list(coords), expires] for key, (coords, expires) in self._data.items()
+                        if coords is not None and expires > now}
+            try:
+                self._write(data)
+            except OSError:
+                logger.exception("Failed to save coordinates cache to %s", self.path)
+                with self._lock:
+                    self._dirty = True
+
+    def _write(self, data: dict) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            now = time.time()
+            for key, (coords, expires) in self._read().items():
+                if expires > now and (key not in data or data[key][1] < expires):
+                    data[key] = [coords, expires]
+            # самые долгоживущие записи в пределах max_size
+            data = dict(sorted(data.items(), key=lambda item: item[1][1])[-self.max_size:])
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _load(self) -> None:
+        now = time.time()
+        for key, (coords, expires) in sorted(self._read().items(), key=lambda item: item[1][1]):
+            if expires > now:
+                self._data[key] = (tuple(coords), expires)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+
+class ForecastCache:
+    """LRU-кэш 3-часовых прогнозов по округленным координатам.
+       Записи действительны до конца текущего интервала bucket_seconds (по UTC),
+       так как OpenWeather обновляет прогноз раз в 3 часа"""
+
+    def __init__(self, max_size: int = 512, bucket_seconds: int = 3 * 3600, precision: int = 2):
+        self.max_size = max_size
+        self.bucket_seconds = bucket_seconds
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[tuple[float, float], tuple[list, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self, lat: float, lon: float) -> list | None:
+        """Возвращает прогноз, если он есть в кэше и относится к текущему интервалу"""
+        key = self._make_key(lat, lon)
+        bucket = self._current_bucket()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] == bucket:
+                self._data.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.inc(cache="forecast", result="hit")
+                return entry[0]
+            self.misses += 1
+            CACHE_LOOKUPS.inc(cache="forecast", result="miss")
+            return None
+
+    def get_or_fetch(self, lat: float, lon: float, fetch: Callable[[], list]) -> list:
+        forecast = self.get(lat, lon)
+        if forecast is not None:
+            return forecast
+        key = self._make_key(lat, lon)
+        bucket = self._current_bucket()
+        return self._flight.do((key, bucket), lambda: self._fetch_and_set(key, bucket, fetch))
+
+    def set(self, lat: float, lon: float, forecast: list) -> None:
+        self._store(self._make_key(lat, lon), self._current_bucket(), forecast)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def _fetch_and_set(self, key: tuple[float, float], bucket: int, fetch: Callable[[], list]) -> list:
+        forecast = fetch()
+        self._store(key, bucket, forecast)
+        return forecast
+
+    def _store(self, key: tuple[float, float], bucket: int, forecast: list) -> None:
+        with self._lock:
+            self._data[key] = (forecast, bucket)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def _make_key(self, lat: float, lon: float) -> tuple[float, float]:
+        return round(lat, self.precision), round(lon, self.precision)
+
+    def _current_bucket(self) -> int:
+        return int(time.time() // self.bucket_seconds)
@@ -0,0 +1,169 @@
+"""Локальный справочник городов для геокодирования без обращения к API и для автодополнения.
+
+Индекс строится один раз из выгрузки GeoNames (cities15000.txt и т.п.) или CSV с колонками
+name,lat,lon[,population] и хранится в бинарном файле, который открывается через mmap:
+    python -m services.gazetteer cities15000.txt gazetteer.idx
+"""
+import bisect
+import csv
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Sequence
+
+import numpy as np
+
+from services.cache import normalize_city
+from services.metrics import CACHE_LOOKUPS
+
+
+MAGIC = b"GZT1"
+HEADER = struct.Struct("<4sIII")
+RECORD_DTYPE = np.dtype([
+    ("key_offset", "<u4"), ("key_len", "<u2"),
+    ("name_offset", "<u4"), ("name_len", "<u2"),
+    ("lat", "<f8"), ("lon", "<f8"), ("population", "<u4"),
+])
+
+
+def make_key(name: str) -> str:
+    return normalize_city(name).replace("ё", "е")
+
+
+class _Keys(Sequence):
+    """Отсортированные ключи индекса, читаемые из mmap по требованию (для bisect)"""
+
+    def __init__(self, records: np.ndarray, blob: memoryview):
+        self._offsets = records["key_offset"]
+        self._lengths = records["key_len"]
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, i: int) -> str:
+        offset = int(self._offsets[i])
+        return bytes(self._blob[offset:offset + int(self._lengths[i])]).decode("utf-8")
+
+
+class Gazetteer:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, keys_size, names_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer index")
+        records_size = count * RECORD_DTYPE.itemsize
+        self._records = np.frombuffer(self._mm, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+        keys_start = HEADER.size + records_size
+        buffer = memoryview(self._mm)
+        self._keys = _Keys(self._records, buffer[keys_start:keys_start + keys_size])
+        self._names = buffer[keys_start + keys_size:keys_start + keys_size + names_size]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get_coordinates(self, city: str) -> tuple[float, float] | None:
+        """Координаты самого крупного города с точно таким названием (с точностью до нормализации)"""
+        key = make_key(city)
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            CACHE_LOOKUPS.inc(cache="gazetteer", result="miss")
+            return None
+        CACHE_LOOKUPS.inc(cache="gazetteer", result="hit")
+        record = self._records[i]
+        return float(record["lat"]), float(record["lon"])
+
+    def search_prefix(self, prefix: str, limit: int = 10) -> list[dict]:
+        """Города, название которых начинается с prefix, по убыванию населения"""
+        key = make_key(prefix)
+        if not key:
+            return []
+        start = bisect.bisect_left(self._keys, key)
+        # все ключи с этим префиксом меньше, чем префикс с максимальным символом на конце
+        end = bisect.bisect_left(self._keys, key + chr(sys.maxunicode), lo=start)
+        matches = self._records[start:end]
+        # по убыванию населения, при равном - в алфавитном порядке, как в индексе
+        order = -matches["population"].astype(np.int64) * len(matches) + np.arange(len(matches))
+        # короткий префикс дает десятки тысяч совпадений: полностью сортируются только самые крупные,
+        # с запасом на повторы одного города под разными названиями
+        k = min(limit * 4, len(matches))
+        while True:
+            top = np.argpartition(order, k - 1)[:k] if k < len(matches) else np.arange(len(matches))
+            cities = self._unique_cities(matches[top[np.argsort(order[top])]], limit)
+            if len(cities) == limit or k == len(matches):
+                return cities
+            k = min(k * 4, len(matches))
+
+    def _unique_cities(self, records: np.ndarray, limit: int) -> list[dict]:
+        cities = []
+        seen = set()
+        for record in records:
+            city = (self._get_name(record), round(float(record["lat"]), 4), round(float(record["lon"]), 4))
+            if city in seen:
+                continue
+            seen.add(city)
+            cities.append({"name": city[0], "lat": city[1], "lon": city[2]})
+            if len(cities) == limit:
+                break
+        return cities
+
+    def _get_name(self, record: np.void) -> str:
+        offset = int(record["name_offset"])
+        return bytes(self._names[offset:offset + int(record["name_len"])]).decode("utf-8")
+
+
+def load_gazetteer(path: str | None) -> Gazetteer | None:
+    """Открывает индекс, если он настроен и уже построен; иначе геокодирование идет только через API"""
+    if not path or not os.path.exists(path):
+        return None
+    return Gazetteer(path)
+
+
+def read_source(path: str, with_alternate_names: bool = True):
+    """Возвращает (название, lat, lon, население) из выгрузки GeoNames или CSV"""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield row["name"], float(row["lat"]), float(row["lon"]), int(row.get("population") or 0)
+            return
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            name, ascii_name, alternate_names = fields[1], fields[2], fields[3]
+            lat, lon, population = float(fields[4]), float(fields[5]), int(fields[14] or 0)
+            names = {name, ascii_name}
+            if with_alternate_names and alternate_names:
+                names.update(alternate_names.split(","))
+            for city_name in names:
+                if city_name:
+                    yield city_name, lat, lon, population
+
+
+def build_index(source_path: str, index_path: str, with_alternate_names: bool = True) -> int:
+    entries = sorted(
+        ((make_key(name), name, lat, lon, population)
+         for name, lat, lon, population in read_source(source_path, with_alternate_names)),
+        key=lambda entry: (entry[0], -entry[4])
+    )
+    records = np.zeros(len(entries), dtype=RECORD_DTYPE)
+    keys, names = bytearray(), bytearray()
+    name_offsets = {}
+    for i, (key, name, lat, lon, population) in enumerate(entries):
+        key_bytes = key.encode("utf-8")
+        if name not in name_offsets:
+            name_offsets[name] = len(names)
+            names.extend(name.encode("utf-8"))
+        records[i] = (len(keys), len(key_bytes), name_offsets[name], len(name.encode("utf-8")),
+                      lat, lon, min(population, 2 ** 32 - 1))
+        keys.extend(key_bytes)
+    with open(index_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(entries), len(keys), len(names)))
+        f.write(records.tobytes())
+        f.write(keys)
+        f.write(names)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    print(f"{build_index(sys.argv[1], sys.argv[2])} names indexed")
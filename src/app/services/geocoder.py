@@ -1,13 +1,38 @@
 import requests
 
+from services.cache import CoordinatesCache
+from services.gazetteer import Gazetteer
+from services.metrics import STAGE_DURATION
+
+
+OPENWEATHER_URL = "http://api.openweathermap.org"
+
 
 class Geocoder:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: CoordinatesCache | None = None,
+                 session: requests.Session | None = None, timeout: tuple[float, float] = (3, 10),
+                 gazetteer: Gazetteer | None = None, base_url: str = OPENWEATHER_URL):
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.gazetteer = gazetteer
+        self.session = session or requests.Session()
+        self.timeout = timeout
 
+    @STAGE_DURATION.time(stage="geocoding")
     def get_coordinates_by_city(self, city: str) -> tuple[float, float] | None:
-        url = f"http://api.openweathermap.org/geo/1.0/direct?q={city}&appid={self.api_key}&limit=5"
-        r = requests.get(url)
+        """Сначала ищет город в локальном справочнике, при промахе обращается к API через кэш"""
+        if self.gazetteer is not None:
+            coords = self.gazetteer.get_coordinates(city)
+            if coords is not None:
+                return coords
+        if self.cache is not None:
+            return self.cache.get_or_fetch(city, lambda: self._request_coordinates(city))
+        return self._request_coordinates(city)
+
+    def _request_coordinates(self, city: str) -> tuple[float, float] | None:
+        url = f"{self.base_url}/geo/1.0/direct"
+        r = self.session.get(url, params={"q": city, "appid": self.api_key, "limit": 5}, timeout=self.timeout)
 
         r.raise_for_status()
         r_json = r.json()
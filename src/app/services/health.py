@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Хранит состояние доступности внешнего сервиса по результатам реальных запросов.
+       closed - запросы проходят; open - после failure_threshold ошибок подряд запросы сразу отклоняются;
+       half_open - через reset_timeout секунд пропускается один пробный запрос, его результат
+       закрывает или снова открывает цепь. Если результат пробы не пришел за reset_timeout секунд,
+       пропускается следующая проба"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """Можно ли сейчас обращаться к сервису. Не меняет состояние"""
+        if self.state == self.CLOSED:
+            return True
+        return self._can_probe(time.monotonic())
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self._can_probe(now):
+                self.state = self.HALF_OPEN
+                self._probe_started_at = now
+                return True
+            return False
+
+    def _can_probe(self, now: float) -> bool:
+        if self.state == self.OPEN:
+            return now - self._opened_at >= self.reset_timeout
+        # результат предыдущей пробы потерян: без этого цепь осталась бы полуоткрытой навсегда
+        return self.state == self.HALF_OPEN and now - self._probe_started_at >= self.reset_timeout
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
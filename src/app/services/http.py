@@ -0,0 +1,80 @@
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.health import CircuitBreaker
+from services.metrics import UPSTREAM_REQUEST_DURATION, UPSTREAM_REQUESTS
+
+
+class UpstreamUnavailable(requests.ConnectionError):
+    """Запрос не отправлен: внешний сервис считается недоступным"""
+
+
+class UpstreamError(Exception):
+    """Асинхронный путь (services/async_weather.py) не получил данные от OpenWeather: ошибка сети, таймаут,
+       ответ 4xx/5xx или разомкнутая цепь. Объявлен здесь, чтобы общий код API не загружал aiohttp"""
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter, который записывает время и итог запросов (вместе с повторами) в метрики"""
+
+    def send(self, request, *args, **kwargs):
+        path = urlsplit(request.url).path
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = super().send(request, *args, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - started, path=path)
+            UPSTREAM_REQUESTS.inc(path=path, status=status)
+
+
+class CircuitBreakerAdapter(InstrumentedAdapter):
+    """HTTPAdapter, который сообщает результаты запросов в CircuitBreaker
+       и сразу отклоняет запросы, пока цепь разомкнута"""
+
+    def __init__(self, breaker: CircuitBreaker, **kwargs):
+        self.breaker = breaker
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs):
+        if not self.breaker.allow_request():
+            UPSTREAM_REQUESTS.inc(path=urlsplit(request.url).path, status="unavailable")
+            raise UpstreamUnavailable("Upstream is marked as unavailable", request=request)
+        try:
+            response = super().send(request, *args, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+
+def create_session(pool_size: int = 10, retries: int = 3, backoff_factor: float = 0.5,
+                   breaker: CircuitBreaker | None = None) -> requests.Session:
+    """Создает сессию с пулом keep-alive соединений и повторными попытками при 429 и 5xx"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter_params = {"pool_connections": pool_size, "pool_maxsize": pool_size, "max_retries": retry}
+    if breaker is not None:
+        adapter = CircuitBreakerAdapter(breaker, **adapter_params)
+    else:
+        adapter = InstrumentedAdapter(**adapter_params)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,221 @@
+"""Счетчики и гистограммы в формате Prometheus для /metrics.
+   Каждый процесс считает свои значения. При нескольких воркерах (serve.py) каждый воркер
+   периодически сохраняет снимок в общую папку, и /metrics суммирует снимки всех воркеров"""
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ContextDecorator
+
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"type": self.type, "help": self.documentation, "labelnames": list(self.labelnames),
+                    "samples": [[list(key), self._dump(value)] for key, value in self._values.items()]}
+
+    def _dump(self, value):
+        return value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram: "Histogram", labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # при использовании как декоратора каждый вызов получает свой таймер (вызовы идут из разных потоков)
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def time(self, **labels) -> _Timer:
+        """Контекстный менеджер и декоратор, измеряющий время выполнения блока"""
+        return _Timer(self, labels)
+
+    def snapshot(self) -> dict:
+        snapshot = super().snapshot()
+        snapshot["buckets"] = list(self.buckets)
+        return snapshot
+
+    def _dump(self, value):
+        counts, total = value
+        return {"counts": list(counts), "sum": total}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._dir: str | None = None
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: Metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def enable_multiprocess(self, path: str, interval: float) -> None:
+        """Включает сохранение снимков этого процесса в path раз в interval секунд"""
+        self._dir = path
+        os.makedirs(path, exist_ok=True)
+        threading.Thread(target=self._write_periodically, args=(interval,), daemon=True).start()
+
+    def write_snapshot(self) -> None:
+        if self._dir is None:
+            return
+        path = os.path.join(self._dir, f"{os.getpid()}.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def _write_periodically(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            self.write_snapshot()
+
+    def collect(self) -> dict:
+        """Снимок этого процесса, просуммированный со снимками остальных воркеров"""
+        merged = self.snapshot()
+        if self._dir is None:
+            return merged
+        own_path = os.path.join(self._dir, f"{os.getpid()}.json")
+        for path in glob.glob(os.path.join(self._dir, "*.json")):
+            if path == own_path:
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, metric in snapshot.items():
+                if name in merged:
+                    _merge_samples(merged[name], metric["samples"])
+        return merged
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        for name, metric in self.collect().items():
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in metric["samples"]:
+                labels = dict(zip(metric["labelnames"], key))
+                if metric["type"] == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip([*metric["buckets"], "+Inf"], value["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def clear_multiprocess_dir(path: str) -> None:
+    """Удаляет снимки прошлого запуска. Вызывается мастер-процессом до запуска воркеров"""
+    for snapshot_path in glob.glob(os.path.join(path, "*.json")):
+        os.remove(snapshot_path)
+
+
+def _merge_samples(metric: dict, samples: list) -> None:
+    values = {tuple(key): value for key, value in metric["samples"]}
+    for key, value in samples:
+        key = tuple(key)
+        current = values.get(key)
+        if current is None:
+            values[key] = value
+        elif metric["type"] == "counter":
+            values[key] = current + value
+        else:
+            values[key] = {"counts": [a + b for a, b in zip(current["counts"], value["counts"])],
+                           "sum": current["sum"] + value["sum"]}
+    metric["samples"] = [[list(key), value] for key, value in values.items()]
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Время обработки запроса к сервису", ("route", "method")
+)
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Запросы к сервису по статусу ответа", ("route", "method", "status")
+)
+UPSTREAM_REQUEST_DURATION = registry.histogram(
+    "upstream_request_duration_seconds", "Время запроса к OpenWeather", ("path",)
+)
+UPSTREAM_REQUESTS = registry.counter(
+    "upstream_requests_total", "Запросы к OpenWeather по статусу ответа или ошибке", ("path", "status")
+)
+CACHE_LOOKUPS = registry.counter(
+    "cache_lookups_total", "Обращения к кэшам и справочнику городов", ("cache", "result")
+)
+STAGE_DURATION = registry.histogram(
+    "stage_duration_seconds", "Время этапов обработки: геокодирование, прогноз, агрегация, "
+                              "DataFrame маршрута, построение графиков", ("stage",)
+)
@@ -0,0 +1,50 @@
+"""Профилирование отдельных запросов через cProfile для Flask-приложения и асинхронных путей.
+   В Python 3.12 в процессе может работать только один профилировщик, поэтому одновременно
+   профилируется один запрос, а запросы, пришедшие в это время, выполняются без профиля"""
+import cProfile
+import os
+import threading
+import time
+import uuid
+from typing import Mapping
+
+from config import config
+
+
+PROFILE_HEADER = "X-Profile"
+
+_lock = threading.Lock()
+
+
+def should_profile(headers: Mapping[str, str]) -> bool:
+    """PROFILE_MODE=all профилирует каждый запрос, PROFILE_MODE=header - только запросы с заголовком X-Profile: 1"""
+    if config.profile_mode == "all":
+        return True
+    return config.profile_mode == "header" and headers.get(PROFILE_HEADER) == "1"
+
+
+def start_profile(headers: Mapping[str, str]) -> cProfile.Profile | None:
+    """Включает профилировщик, если запрос нужно профилировать и другой профиль сейчас не снимается"""
+    if not should_profile(headers) or not _lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # профилировщик уже включен не этим модулем, например отладчиком
+        _lock.release()
+        return None
+    return profiler
+
+
+def stop_profile(profiler: cProfile.Profile) -> None:
+    profiler.disable()
+    _lock.release()
+
+
+def save_profile(profiler: cProfile.Profile, endpoint: str) -> str:
+    """Сохраняет профиль в PROFILE_DIR (открывается через pstats или snakeviz) и возвращает имя файла"""
+    os.makedirs(config.profile_dir, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{uuid.uuid4().hex[:8]}.prof"
+    profiler.dump_stats(os.path.join(config.profile_dir, name))
+    return name
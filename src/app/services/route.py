@@ -0,0 +1,27 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+from services.weather import WeatherService
+
+
+class RouteForecaster:
+    """Получает прогнозы для всех городов маршрута параллельно в общем пуле потоков.
+       Результаты возвращаются в порядке маршрута"""
+
+    def __init__(self, weather_service: WeatherService, max_workers: int = 8):
+        self.weather_service = weather_service
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="route")
+
+    def submit_forecasts(self, cities: list[str], days: int) -> list[Future]:
+        """Запускает получение прогнозов и возвращает Future для каждого города в порядке маршрута"""
+        return [self.executor.submit(self.weather_service.get_forecast_for, city, days) for city in cities]
+
+    def get_forecasts_with_coords(self, cities: list[str], days: int) -> Iterator[tuple[list, float, float] | None]:
+        return self.executor.map(lambda city: self._get_forecast_with_coords(city, days), cities)
+
+    def _get_forecast_with_coords(self, city: str, days: int) -> tuple[list, float, float] | None:
+        forecast = self.weather_service.get_forecast_for(city, days)
+        if forecast is None:
+            return None
+        lat, lon = self.weather_service.geocoder.get_coordinates_by_city(city)
+        return forecast, lat, lon
@@ -2,15 +2,22 @@ from pprint import pprint
 
 import requests
 
-from statistics import mean
-
-from services.geocoder import Geocoder
+from services.aggregation import aggregate_daily_forecasts
+from services.cache import ForecastCache
+from services.geocoder import OPENWEATHER_URL, Geocoder
+from services.metrics import STAGE_DURATION
 
 
 class WeatherService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, geocoder: Geocoder | None = None, forecast_cache: ForecastCache | None = None,
+                 session: requests.Session | None = None, timeout: tuple[float, float] = (3, 10),
+                 base_url: str = OPENWEATHER_URL):
         self.api_key = api_key
-        self.geocoder = Geocoder(api_key)
+        self.base_url = base_url.rstrip("/")
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.geocoder = geocoder or Geocoder(api_key, session=self.session, timeout=timeout, base_url=base_url)
+        self.forecast_cache = forecast_cache
 
     def get_forecast_for(self, city: str, days: int) -> list | None:
         if not (1 <= days <= 5):
@@ -20,24 +27,34 @@ class WeatherService:
             return None
         return daily_5days_forecast[:days]
 
+    @STAGE_DURATION.time(stage="aggregation")
+    def make_daily_forecasts(self, hourly_forecasts: list[list]) -> list[list[dict]]:
+        """Сводит 3-часовые прогнозы нескольких городов в дневные с вердиктом для каждого дня"""
+        daily_forecasts = aggregate_daily_forecasts(hourly_forecasts)
+        for city_forecast in daily_forecasts:
+            for day_forecast in city_forecast:
+                day_forecast["verdict"] = self._get_weather_verdict(day_forecast)
+        return daily_forecasts
+
     def _get_daily_5days_forecast(self, city: str) -> list | None:
         hourly_forecast = self._get_3hourly_5days_forecast(city)
         if not hourly_forecast:
             return None
-        daily_forecast = []
-        for hourly_day_forecast in self._extract_daily_3hourly_forecast(hourly_forecast):
-            day_forecast = self._make_1day_forecast(hourly_day_forecast)
-            daily_forecast.append(day_forecast)
-        return daily_forecast
+        return self.make_daily_forecasts([hourly_forecast])[0]
 
     def _get_3hourly_5days_forecast(self, city: str) -> list | None:
         coords = self.geocoder.get_coordinates_by_city(city)
         if coords is None:
             return None
         lat, lon = coords
-
-        url = f"http://api.openweathermap.org/data/2.5/forecast"
-        r = requests.get(url, params={
+        with STAGE_DURATION.time(stage="forecast_fetch"):
+            if self.forecast_cache is not None:
+                return self.forecast_cache.get_or_fetch(lat, lon, lambda: self._request_forecast(lat, lon))
+            return self._request_forecast(lat, lon)
+
+    def _request_forecast(self, lat: float, lon: float) -> list:
+        url = f"{self.base_url}/data/2.5/forecast"
+        r = self.session.get(url, timeout=self.timeout, params={
             "appid": self.api_key,
             "lang": "ru",
             "units": "metric",
@@ -49,37 +66,6 @@ class WeatherService:
         r_json = r.json()
         return r_json["list"]
 
-    @staticmethod
-    def _extract_daily_3hourly_forecast(hourly_forecast: list) -> list:
-        daily_3hourly_forecast = []
-
-        day_3hourly_forecast = []
-        for epoch in hourly_forecast:
-            if epoch["dt_txt"].split()[-1] == "00:00:00" and day_3hourly_forecast:
-                daily_3hourly_forecast.append(day_3hourly_forecast)
-                day_3hourly_forecast = []
-            day_3hourly_forecast.append(epoch)
-
-        return daily_3hourly_forecast
-
-    def _make_1day_forecast(self, hourly_forecast: list) -> dict:
-        day_forecast = {}
-        day_forecast["temperature"] = round(
-            mean([hfc["main"]["temp"] for hfc in hourly_forecast]), 1
-        )
-        day_forecast["wind_speed"] = round(
-            mean([hfc["wind"]["speed"] for hfc in hourly_forecast]), 1
-        )
-        day_forecast["probability_of_precipitation"] = max(
-            [hfc["pop"] for hfc in hourly_forecast]
-        )
-        day_forecast["humidity"] = round(
-            mean([hfc["main"]["humidity"] for hfc in hourly_forecast])
-        )
-        day_forecast["date"] = hourly_forecast[0]["dt_txt"].split()[0]
-        day_forecast["verdict"] = self._get_weather_verdict(day_forecast)
-        return day_forecast
-
     def _get_weather_verdict(self, conditions: dict) -> str:
         if self._is_weather_good(conditions):
             return "Самое время для прогулки!"
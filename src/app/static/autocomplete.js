@@ -0,0 +1,37 @@
+// Подсказки городов из локального справочника (/api/cities) для полей формы маршрута
+(function () {
+    const DEBOUNCE_MS = 150;
+    const datalist = document.getElementById("citySuggestions");
+    let timer = null;
+    let controller = null;
+
+    function showSuggestions(cities) {
+        datalist.replaceChildren(...cities.map((city) => {
+            const option = document.createElement("option");
+            option.value = city.name;
+            return option;
+        }));
+    }
+
+    function requestSuggestions(prefix) {
+        if (controller) {
+            controller.abort();
+        }
+        if (prefix.trim().length < 2) {
+            showSuggestions([]);
+            return;
+        }
+        controller = new AbortController();
+        fetch("/api/cities?" + new URLSearchParams({q: prefix, limit: 10}), {signal: controller.signal})
+            .then((response) => response.ok ? response.json() : {cities: []})
+            .then((data) => showSuggestions(data.cities))
+            .catch(() => {});
+    }
+
+    document.querySelectorAll("input[list=citySuggestions]").forEach((input) => {
+        input.addEventListener("input", () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => requestSuggestions(input.value), DEBOUNCE_MS);
+        });
+    });
+})();
@@ -0,0 +1,113 @@
+// Прогноз по городам маршрута появляется на странице по мере готовности (/api/forecasts/stream),
+// после чего форма отправляется как обычно и открывается дашборд
+(function () {
+    const form = document.getElementById("routeForm");
+    const progress = document.getElementById("routeProgress");
+    const button = form.querySelector("button[type=submit]");
+
+    // как str.capitalize() в get_cities_from_request
+    function capitalize(city) {
+        return city.charAt(0).toUpperCase() + city.slice(1).toLowerCase();
+    }
+
+    function getCities() {
+        const departure = capitalize(form.elements.departureCity.value);
+        const destination = capitalize(form.elements.destinationCity.value);
+        if (!departure || !destination) {
+            return null;
+        }
+        const additional = form.elements.additionalCities.value;
+        const additionalCities = additional ? additional.split(",").map((city) => capitalize(city.trim())) : [];
+        return [departure, ...additionalCities, destination];
+    }
+
+    function makeCard(city) {
+        const card = document.createElement("div");
+        card.className = "city-forecast pending";
+        const title = document.createElement("h3");
+        title.textContent = city;
+        const body = document.createElement("p");
+        body.textContent = "Загрузка прогноза...";
+        card.append(title, body);
+        return card;
+    }
+
+    function showResult(card, result) {
+        card.classList.remove("pending");
+        const body = card.querySelector("p");
+        if (result.status !== 200) {
+            card.classList.add("failed");
+            body.textContent = result.status === 404 ? "Город не найден" : "Сервис погоды временно недоступен";
+            return;
+        }
+        const days = result.forecast.map((day) => {
+            const item = document.createElement("li");
+            item.textContent = `${day.date}: ${day.temperature}°C, ветер ${day.wind_speed} м/с, `
+                + `осадки ${Math.round(day.probability_of_precipitation * 100)}%. ${day.verdict}`;
+            return item;
+        });
+        const list = document.createElement("ul");
+        list.append(...days);
+        body.replaceWith(list);
+    }
+
+    async function* readResults(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        while (true) {
+            const {value, done} = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, {stream: true});
+            const lines = buffer.split("\n");
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (line.trim()) {
+                    yield JSON.parse(line);
+                }
+            }
+        }
+        if (buffer.trim()) {
+            yield JSON.parse(buffer);
+        }
+    }
+
+    form.addEventListener("submit", async (event) => {
+        const cities = getCities();
+        if (!cities || !window.ReadableStream) {
+            // ошибку ввода покажет сервер
+            return;
+        }
+        event.preventDefault();
+        button.disabled = true;
+        const cards = cities.map(makeCard);
+        progress.replaceChildren(...cards);
+        let failed = false;
+        try {
+            const response = await fetch("/api/forecasts/stream", {
+                method: "POST",
+                headers: {"Content-Type": "application/json"},
+                body: JSON.stringify({cities: cities, days: 5}),
+            });
+            if (!response.ok) {
+                form.submit();
+                return;
+            }
+            for await (const result of readResults(response)) {
+                showResult(cards[result.index], result);
+                failed = failed || result.status !== 200;
+            }
+        } catch (error) {
+            form.submit();
+            return;
+        }
+        if (failed) {
+            button.disabled = false;
+            return;
+        }
+        // прогнозы уже в кэшах сервиса, поэтому дашборд строится без повторного ожидания OpenWeather
+        form.submit();
+    });
+})();
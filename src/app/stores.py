@@ -0,0 +1,132 @@
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+class ResultStore(ABC):
+    """Хранилище результатов маршрутов по идентификатору с TTL и ограничением количества записей"""
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def put(self, value: Any) -> str:
+        """Сохраняет значение и возвращает идентификатор маршрута"""
+
+    @abstractmethod
+    def get(self, key: str) -> Any | None:
+        """Значение по идентификатору или None, если его нет или истек срок хранения"""
+
+    @staticmethod
+    def _new_key() -> str:
+        return uuid.uuid4().hex
+
+
+class MemoryResultStore(ResultStore):
+    """Хранилище в памяти процесса. Подходит только для одного воркера"""
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 256):
+        super().__init__(ttl, max_entries)
+        self._data: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, value: Any) -> str:
+        key = self._new_key()
+        self._set(key, value, time.time() + self.ttl)
+        return key
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def _set(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._evict(time.time())
+
+    def _evict(self, now: float) -> None:
+        expired = [key for key, (_, expires) in self._data.items() if expires < now]
+        for key in expired:
+            del self._data[key]
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+class SqliteResultStore(ResultStore):
+    """Хранилище в локальном SQLite-файле, общее для нескольких воркеров на одной машине.
+       Последние local_size прочитанных или сохраненных значений хранятся в памяти процесса,
+       чтобы callback-и дашборда не распаковывали весь маршрут из базы при каждом запросе.
+       Значение по ключу не меняется после сохранения, поэтому эта копия не устаревает"""
+
+    def __init__(self, path: str, ttl: float = 3600, max_entries: int = 256, local_size: int = 16):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self._local = MemoryResultStore(ttl, local_size)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+
+    def put(self, value: Any) -> str:
+        key = self._new_key()
+        now = time.time()
+        # дашборд обычно открывается в том же воркере, что построил маршрут
+        self._local._set(key, value, now + self.ttl)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            conn.execute("INSERT INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, blob, now + self.ttl))
+            conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY expires_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+        return key
+
+    def get(self, key: str) -> Any | None:
+        value = self._local.get(key)
+        if value is not None:
+            return value
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM results WHERE key = ? AND expires_at >= ?",
+                               (key, time.time())).fetchone()
+        if row is None:
+            return None
+        value = pickle.loads(row[0])
+        self._local._set(key, value, row[1])
+        return value
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def create_result_store(backend: str, path: str, ttl: float, max_entries: int, local_size: int = 16) -> ResultStore:
+    if backend == "memory":
+        return MemoryResultStore(ttl, max_entries)
+    if backend == "sqlite":
+        return SqliteResultStore(path, ttl, max_entries, local_size)
+    raise ValueError(f"Unknown result store backend: {backend}")
@@ -0,0 +1,107 @@
+"""Локальная замена OpenWeather для нагрузочных прогонов: геокодинг /geo/1.0/direct и прогноз /data/2.5/forecast.
+   Ответы детерминированы: координаты выводятся из названия города, прогноз - из координат.
+   Города, начинающиеся с "nowhere", не находятся. Задержка и доля ошибок задаются при запуске.
+   Запуск из папки app: python -m testing.fake_openweather --port 8090 --latency 0.05 --error-rate 0.01
+   Сервис направляется на нее через OPENWEATHER_URL=http://127.0.0.1:8090"""
+import argparse
+import asyncio
+import random
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+
+FORECAST_STEPS = 40
+NOT_FOUND_PREFIX = "nowhere"
+
+settings_key = web.AppKey("settings", dict)
+stats_key = web.AppKey("stats", Counter)
+rng_key = web.AppKey("rng", random.Random)
+
+
+def make_coordinates(city: str) -> tuple[float, float]:
+    h = zlib.crc32(" ".join(city.split()).casefold().encode("utf-8"))
+    return round(40 + (h % 3000) / 100, 4), round(20 + (h // 3000 % 12000) / 100, 4)
+
+
+def make_forecast(lat: float, lon: float, now: datetime | None = None) -> list[dict]:
+    """40 трехчасовых отсчетов начиная с ближайшей границы трех часов, как в ответе OpenWeather"""
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(hour=now.hour - now.hour % 3, minute=0, second=0, microsecond=0) + timedelta(hours=3)
+    rng = random.Random(f"{lat:.2f},{lon:.2f},{start:%Y%m%d%H}")
+    base_temp = rng.uniform(-20, 30)
+    forecast = []
+    for i in range(FORECAST_STEPS):
+        moment = start + timedelta(hours=3 * i)
+        forecast.append({
+            "dt": int(moment.timestamp()),
+            "dt_txt": moment.strftime("%Y-%m-%d %H:%M:%S"),
+            "main": {"temp": round(base_temp + rng.uniform(-5, 5), 2), "humidity": rng.randint(30, 100)},
+            "wind": {"speed": round(rng.uniform(0, 15), 2)},
+            "pop": round(rng.random(), 2),
+            "weather": [{"description": "облачно"}],
+        })
+    return forecast
+
+
+@web.middleware
+async def upstream_middleware(request: web.Request, handler):
+    """Задержка и случайные ошибки перед ответом, учет запросов по путям и статусам для /stats"""
+    settings = request.app[settings_key]
+    if request.path == "/stats":
+        return await handler(request)
+    latency = settings["latency"]
+    if latency:
+        await asyncio.sleep(latency * request.app[rng_key].uniform(1 - settings["jitter"], 1 + settings["jitter"]))
+    if request.app[rng_key].random() < settings["error_rate"]:
+        response = web.json_response({"cod": 503, "message": "fake upstream error"}, status=503)
+    else:
+        response = await handler(request)
+    request.app[stats_key][f"{request.path} {response.status}"] += 1
+    return response
+
+
+async def geocode(request: web.Request) -> web.Response:
+    city = request.query.get("q", "")
+    if not city.strip() or city.strip().casefold().startswith(NOT_FOUND_PREFIX):
+        return web.json_response([])
+    lat, lon = make_coordinates(city)
+    return web.json_response([{"name": city, "lat": lat, "lon": lon, "country": "RU"}])
+
+
+async def forecast(request: web.Request) -> web.Response:
+    try:
+        lat, lon = float(request.query["lat"]), float(request.query["lon"])
+    except (KeyError, ValueError):
+        return web.json_response({"cod": "400", "message": "wrong latitude"}, status=400)
+    return web.json_response({"cod": "200", "cnt": FORECAST_STEPS, "list": make_forecast(lat, lon)})
+
+
+async def get_stats(request: web.Request) -> web.Response:
+    return web.json_response(dict(request.app[stats_key]))
+
+
+def create_app(latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0) -> web.Application:
+    app = web.Application(middlewares=[upstream_middleware])
+    app[settings_key] = {"latency": latency, "jitter": jitter, "error_rate": error_rate}
+    app[stats_key] = Counter()
+    app[rng_key] = random.Random(seed)
+    app.router.add_get("/geo/1.0/direct", geocode)
+    app.router.add_get("/data/2.5/forecast", forecast)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная замена OpenWeather")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.05, help="средняя задержка ответа, секунды")
+    parser.add_argument("--jitter", type=float, default=0.2, help="разброс задержки, доля от --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency, args.jitter, args.error_rate, args.seed),
+                host=args.host, port=args.port, print=None, access_log=None)
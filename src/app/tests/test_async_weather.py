@@ -0,0 +1,65 @@
+"""Пробный запрос полуоткрытой цепи должен закрывать или снова открывать ее при любом исходе.
+   Запуск из папки src/app: python -m unittest discover -s tests"""
+import asyncio
+import unittest
+
+import aiohttp
+from aiohttp import web
+
+from services.async_weather import AsyncWeatherService, UpstreamError
+from services.health import CircuitBreaker
+from services.weather import WeatherService
+
+
+class HalfOpenProbeTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.body = "{not json"
+        self.hang = False
+        self.release = asyncio.Event()
+        app = web.Application()
+        app.router.add_get("/geo/1.0/direct", self.geocode)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        self.session = aiohttp.ClientSession()
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        self.service = AsyncWeatherService(WeatherService("key", base_url=f"http://127.0.0.1:{port}"),
+                                           self.session, breaker=self.breaker, retries=0)
+        # цепь открыта, и следующий запрос станет пробным
+        self.breaker.record_failure()
+
+    async def asyncTearDown(self):
+        self.release.set()
+        await self.session.close()
+        await self.runner.cleanup()
+
+    async def geocode(self, request: web.Request) -> web.Response:
+        if self.hang:
+            await self.release.wait()
+        return web.Response(text=self.body, content_type="application/json")
+
+    async def test_malformed_body_reopens_breaker(self):
+        with self.assertRaises(UpstreamError):
+            await self.service.get_coordinates_by_city("Город")
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.body = '[{"lat": 1.5, "lon": 2.5}]'
+        self.assertEqual(await self.service.get_coordinates_by_city("Город"), (1.5, 2.5))
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    async def test_cancelled_probe_reopens_breaker(self):
+        self.hang = True
+        task = asyncio.ensure_future(self.service._get_json(self.service.geocoding_url, {"q": "Город"}))
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
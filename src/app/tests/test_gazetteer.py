@@ -0,0 +1,40 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from services.gazetteer import Gazetteer, build_index
+
+
+class SearchPrefixTest(unittest.TestCase):
+    def setUp(self):
+        # индекс открыт через mmap до конца процесса, на Windows его файл не удалить
+        self.dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        source = os.path.join(self.dir.name, "cities.csv")
+        with open(source, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "lat", "lon", "population"])
+            # по алфавиту эти поселки идут раньше Москвы
+            for i in range(1500):
+                writer.writerow([f"Моа{i}", 0, i / 100, 100 + i % 7])
+            writer.writerow(["Москва", 55.75, 37.62, 12_000_000])
+            writer.writerow(["Мурманск", 68.97, 33.07, 270_000])
+        index = os.path.join(self.dir.name, "gazetteer.idx")
+        build_index(source, index)
+        self.gazetteer = Gazetteer(index)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_largest_cities_first_among_all_matches(self):
+        names = [city["name"] for city in self.gazetteer.search_prefix("Мо", 3)]
+        self.assertEqual(names[0], "Москва")
+        self.assertEqual([city["name"] for city in self.gazetteer.search_prefix("м", 2)], ["Москва", "Мурманск"])
+
+    def test_same_population_in_index_order(self):
+        first = [city["name"] for city in self.gazetteer.search_prefix("Моа", 5)]
+        self.assertEqual(first, [city["name"] for city in self.gazetteer.search_prefix("Моа", 10)][:5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import time
+import unittest
+
+from services.health import CircuitBreaker
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def test_lost_probe_does_not_block_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        # результат пробы так и не пришел
+        self.assertFalse(breaker.allow_request())
+        self.assertFalse(breaker.is_available())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.is_available())
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +0,0 @@
-import socket
-
-
-def is_connected() -> bool:
-    try:
-        socket.create_connection(("8.8.8.8", 53))
-        return True
-    except OSError:
-        return False
\ No newline at end of file
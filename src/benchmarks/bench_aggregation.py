@@ -0,0 +1,78 @@
+"""Сравнивает векторизованную дневную агрегацию с прежней реализацией на циклах. Печатает результат в JSON.
+   Запуск из папки src: python benchmarks/bench_aggregation.py"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from statistics import mean
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from services.aggregation import aggregate_daily_forecasts
+
+
+def legacy_extract_daily_3hourly_forecast(hourly_forecast: list) -> list:
+    daily_3hourly_forecast = []
+    day_3hourly_forecast = []
+    for epoch in hourly_forecast:
+        if epoch["dt_txt"].split()[-1] == "00:00:00" and day_3hourly_forecast:
+            daily_3hourly_forecast.append(day_3hourly_forecast)
+            day_3hourly_forecast = []
+        day_3hourly_forecast.append(epoch)
+    return daily_3hourly_forecast
+
+
+def legacy_make_1day_forecast(hourly_forecast: list) -> dict:
+    return {
+        "temperature": round(mean([hfc["main"]["temp"] for hfc in hourly_forecast]), 1),
+        "wind_speed": round(mean([hfc["wind"]["speed"] for hfc in hourly_forecast]), 1),
+        "probability_of_precipitation": max([hfc["pop"] for hfc in hourly_forecast]),
+        "humidity": round(mean([hfc["main"]["humidity"] for hfc in hourly_forecast])),
+        "date": hourly_forecast[0]["dt_txt"].split()[0],
+    }
+
+
+def legacy_aggregate(hourly_forecasts: list[list]) -> list[list[dict]]:
+    return [[legacy_make_1day_forecast(day) for day in legacy_extract_daily_3hourly_forecast(hourly_forecast)]
+            for hourly_forecast in hourly_forecasts]
+
+
+def make_hourly_forecast(rng: random.Random) -> list[dict]:
+    start = datetime(2025, 1, 1, rng.choice(range(0, 24, 3)))
+    return [{
+        "dt_txt": (start + timedelta(hours=3 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        "main": {"temp": round(rng.uniform(-30, 40), 2), "humidity": rng.randint(10, 100)},
+        "wind": {"speed": round(rng.uniform(0, 20), 2)},
+        "pop": round(rng.random(), 2),
+    } for i in range(40)]
+
+
+def main(sizes: list[int], repeat: int) -> list[dict]:
+    rng = random.Random(0)
+    results = []
+    for cities in sizes:
+        batch = [make_hourly_forecast(rng) for _ in range(cities)]
+        assert aggregate_daily_forecasts(batch) == legacy_aggregate(batch)
+        number = max(1, 1000 // cities)
+        legacy = min(timeit.repeat(lambda: legacy_aggregate(batch), number=number, repeat=repeat)) / number
+        vectorized = min(timeit.repeat(lambda: aggregate_daily_forecasts(batch), number=number,
+                                       repeat=repeat)) / number
+        results.append({
+            "scenario": "aggregation",
+            "cities": cities,
+            "legacy_ms": round(legacy * 1000, 4),
+            "vectorized_ms": round(vectorized * 1000, 4),
+            "speedup": round(legacy / vectorized, 2),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(main(args.sizes, args.repeat), indent=2))
@@ -0,0 +1,104 @@
+"""Нагрузочный прогон обработчиков бота без Telegram.
+   Каждый пользователь проходит сценарий /weather -> дни -> два города -> показать прогноз.
+   Без --weather-url сервис погоды заменяется заглушкой, с ним бот обращается к запущенному веб-сервису
+   (например, к serve.py поверх testing/fake_openweather.py, как в bench_load.py).
+   Запуск из папки src: python benchmarks/bench_bot.py --users 200 --api-latency 0.05"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import AsyncIterator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bot"))
+os.environ.setdefault("BOT_TOKEN", "42:FAKE")
+
+from bot import create_dispatcher
+from external_services.cache import ForecastCache
+from external_services.weather_api import WeatherApi, create_session
+from storages.memory import TTLMemoryStorage
+from testing.fake_telegram import FakeUser, create_fake_bot
+
+CITIES = ["Москва", "Тверь", "Клин", "Казань", "Самара", "Пермь", "Омск", "Сочи"]
+
+
+class StubWeatherApi:
+    """Заменяет WeatherApi: отвечает готовым прогнозом с заданной задержкой"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def get_weather_for(self, city: str, days: int = 5, timeout: int = 5) -> list[dict]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [{"date": f"2025-01-0{day + 1}", "temperature": 1.5, "wind_speed": 3.2,
+                 "probability_of_precipitation": 0.2, "humidity": 80} for day in range(days)]
+
+    async def city_exists(self, city: str, timeout: int = 5) -> bool:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return True
+
+    async def stream_weather_for_route(self, cities: list[str], days: int = 5,
+                                       timeout: int = 15) -> AsyncIterator[list[tuple[int, list[dict]]]]:
+        yield list(enumerate(await asyncio.gather(*[self.get_weather_for(city, days) for city in cities])))
+
+    def prefetch(self, city: str) -> None:
+        pass
+
+
+async def run_user_flow(dp, bot, user: FakeUser, departure: str, destination: str) -> float:
+    started = time.perf_counter()
+    for update in (user.message("/weather"), user.callback("3"), user.message(departure),
+                   user.message(destination), user.callback("confirm")):
+        await dp.feed_update(bot, update)
+    return time.perf_counter() - started
+
+
+async def main(users: int, api_latency: float, telegram_latency: float, weather_url: str | None = None) -> dict:
+    bot = create_fake_bot(telegram_latency)
+    session = None
+    if weather_url:
+        session = create_session()
+        weather_api = WeatherApi(session, cache=ForecastCache(), base_url=weather_url)
+    else:
+        weather_api = StubWeatherApi(api_latency)
+    dp = create_dispatcher(TTLMemoryStorage(), weather_api)
+    started = time.perf_counter()
+    try:
+        durations = await asyncio.gather(*[
+            run_user_flow(dp, bot, FakeUser(user_id), CITIES[user_id % len(CITIES)],
+                          CITIES[(user_id + 1) % len(CITIES)])
+            for user_id in range(1, users + 1)
+        ])
+    finally:
+        if session is not None:
+            await session.close()
+    total = time.perf_counter() - started
+    durations = sorted(durations)
+    result = {
+        "scenario": "bot_route_flow",
+        "weather_api": "service" if weather_url else "stub",
+        "users": users,
+        "total_s": round(total, 4),
+        "flows_per_s": round(users / total, 2),
+        "p50_s": round(durations[len(durations) // 2], 4),
+        "p95_s": round(durations[int(len(durations) * 0.95) - 1], 4),
+        "telegram_requests": len(bot.session.requests),
+    }
+    if not weather_url:
+        result["weather_api_calls"] = weather_api.calls
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--api-latency", type=float, default=0.05)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--weather-url", help="адрес API веб-сервиса, например http://127.0.0.1:5000/api")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.users, args.api_latency, args.telegram_latency, args.weather_url)),
+                     ensure_ascii=False))
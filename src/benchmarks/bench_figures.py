@@ -0,0 +1,70 @@
+"""Измеряет подготовку данных маршрута и построение графиков дашборда для маршрутов разной длины:
+   RouteDataset, графики города, карта маршрута, сериализация фигур в JSON (ее делает Dash при каждом ответе)
+   и данные для клиентских графиков. Печатает результат в JSON.
+   Запуск из папки src: python benchmarks/bench_figures.py"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from app import GRAPH_LABELS, get_graph, make_map_figure
+from dataset import RouteDataset
+from services.weather import WeatherService
+from testing.fake_openweather import make_coordinates, make_forecast
+
+
+def make_cities_data(cities: int) -> list[dict]:
+    """Данные маршрута в том виде, в каком их собирает index(): дневные прогнозы с координатами"""
+    names = [f"Город {i}" for i in range(cities)]
+    coords = [make_coordinates(name) for name in names]
+    daily = WeatherService("").make_daily_forecasts([make_forecast(lat, lon) for lat, lon in coords])
+    return [{**day, "lat": lat, "lon": lon, "city_name": name}
+            for name, (lat, lon), city_forecast in zip(names, coords, daily) for day in city_forecast[:5]]
+
+
+def build_city_figures(dataset: RouteDataset) -> list:
+    city = dataset.cities[0]
+    return [get_graph(dataset.get_city_days(city, 5), metric, title.format(city=city), y_label)
+            for metric, (title, y_label) in GRAPH_LABELS.items()]
+
+
+def build_map_figure(dataset: RouteDataset):
+    date = dataset.dates[0]
+    return make_map_figure(dataset.get_date(date), date)
+
+
+def measure(fn, repeat: int) -> float:
+    number = max(1, int(0.2 / max(timeit.timeit(fn, number=1), 1e-6)))
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main(sizes: list[int], repeat: int) -> list[dict]:
+    results = []
+    for cities in sizes:
+        cities_data = make_cities_data(cities)
+        dataset = RouteDataset(cities_data)
+        figures = [*build_city_figures(dataset), build_map_figure(dataset)]
+        timings = {
+            "dataset": lambda: RouteDataset(cities_data),
+            "city_figures": lambda: build_city_figures(dataset),
+            "map_figure": lambda: build_map_figure(dataset),
+            "figures_to_json": lambda: [figure.to_json() for figure in figures],
+            "client_data": lambda: json.dumps(dataset.to_client_data()),
+        }
+        results.append({
+            "scenario": "dashboard_figures",
+            "cities": cities,
+            **{f"{name}_ms": round(measure(fn, repeat) * 1000, 4) for name, fn in timings.items()},
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 10, 30])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(main(args.sizes, args.repeat), indent=2))
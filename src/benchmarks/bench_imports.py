@@ -0,0 +1,60 @@
+"""Измеряет время импорта и память точек входа веб-сервиса в чистом интерпретаторе
+   и проверяет, какие тяжелые пакеты они загружают. Печатает результат в JSON.
+   Запуск из папки src: python benchmarks/bench_imports.py [--repeat 5]"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+ENTRY_POINTS = {
+    "api_flask": "api",
+    "api_async": "async_server",
+    "dashboard": "app",
+    "dashboard_preloaded": "app; app.preload()",
+}
+HEAVY_PACKAGES = ("pandas", "plotly.express", "dash")
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "import_s": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(module: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+        cwd=APP_DIR, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(repeat: int) -> list[dict]:
+    results = []
+    for name, module in ENTRY_POINTS.items():
+        runs = [measure(module) for _ in range(repeat)]
+        results.append({
+            "scenario": f"import_{name}",
+            "repeat": repeat,
+            "import_s_median": round(statistics.median(run["import_s"] for run in runs), 4),
+            "import_s_min": round(min(run["import_s"] for run in runs), 4),
+            "max_rss_mb": round(statistics.median(run["max_rss_mb"] for run in runs), 1),
+            "loaded": runs[-1]["loaded"],
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(main(args.repeat), indent=2))
@@ -0,0 +1,249 @@
+"""Нагрузочные сценарии веб-сервиса без доступа к OpenWeather: поднимает testing/fake_openweather.py
+   и serve.py на свободных портах, прогоняет сценарии и печатает результат в JSON.
+   Сценарии:
+       api_forecast - GET /api/forecasts/<city>
+       api_route    - POST /api/forecasts с городами маршрута
+       api_stream   - POST /api/forecasts/stream, дополнительно время до первого города
+       form_route   - отправка формы маршрута на / (до перенаправления на дашборд)
+       bot_route    - сценарий бота из bench_bot.py поверх запущенного сервиса
+   Запуск из папки src: python benchmarks/bench_load.py --workers 2 --latency 0.05 --output load.json"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+import aiohttp
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(SRC_DIR, "app")
+SCENARIOS = ("api_forecast", "api_route", "api_stream", "form_route", "bot_route")
+READY_TIMEOUT = 60
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_process(args: list[str], env: dict | None = None) -> Iterator[subprocess.Popen]:
+    # вывод пишется в файл, а не в pipe: заполненный pipe остановил бы процесс посреди прогона
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(args, cwd=APP_DIR, env={**os.environ, **(env or {})},
+                               stdout=subprocess.DEVNULL, stderr=log)
+    process.log = log
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        log.close()
+
+
+async def wait_ready(url: str, process: subprocess.Popen) -> None:
+    started = time.monotonic()
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() - started < READY_TIMEOUT:
+            if process.poll() is not None:
+                process.log.seek(0)
+                raise RuntimeError(f"{process.args} exited: {process.log.read().decode()[-2000:]}")
+            try:
+                async with session.get(url) as r:
+                    if r.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} is not ready after {READY_TIMEOUT}s")
+
+
+async def get_upstream_stats(session: aiohttp.ClientSession, upstream_url: str) -> Counter:
+    async with session.get(f"{upstream_url}/stats") as r:
+        return Counter(await r.json())
+
+
+def summarize(name: str, durations: list[float], statuses: Counter, total: float, upstream: Counter,
+              **params) -> dict:
+    durations = sorted(durations)
+    quantiles = statistics.quantiles(durations, n=100, method="inclusive") if len(durations) > 1 else durations * 99
+    return {
+        "scenario": name,
+        **params,
+        "requests": len(durations),
+        "total_s": round(total, 4),
+        "rps": round(len(durations) / total, 2),
+        "mean_ms": round(statistics.fmean(durations) * 1000, 2),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "upstream_requests": dict(sorted(upstream.items())),
+    }
+
+
+async def run_load(name: str, session: aiohttp.ClientSession, upstream_url: str, requests: int, concurrency: int,
+                   make_request, **params) -> dict:
+    """Выполняет requests запросов make_request(i) не более чем по concurrency одновременно"""
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+    statuses = Counter()
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status = await make_request(i)
+            except (aiohttp.ClientError, TimeoutError) as e:
+                status = type(e).__name__
+            durations.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    upstream_before = await get_upstream_stats(session, upstream_url)
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    total = time.perf_counter() - started
+    upstream = await get_upstream_stats(session, upstream_url) - upstream_before
+    return summarize(name, durations, statuses, total, upstream, concurrency=concurrency, **params)
+
+
+def make_route(rng: random.Random, cities: list[str], length: int) -> list[str]:
+    return rng.sample(cities, length)
+
+
+async def run_scenarios(base_url: str, upstream_url: str, scenarios: list[str], requests: int, concurrency: int,
+                        city_pool: int, route_length: int, bot_users: int) -> list[dict]:
+    rng = random.Random(0)
+    cities = [f"Город {i}" for i in range(city_pool)]
+    results = []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        async def get_forecast(i: int) -> int:
+            async with session.get(f"{base_url}/api/forecasts/{rng.choice(cities)}") as r:
+                await r.read()
+                return r.status
+
+        async def post_route(i: int) -> int:
+            async with session.post(f"{base_url}/api/forecasts",
+                                    json={"cities": make_route(rng, cities, route_length), "days": 5}) as r:
+                await r.read()
+                return r.status
+
+        first_results = []
+
+        async def stream_route(i: int) -> int:
+            started = time.perf_counter()
+            async with session.post(f"{base_url}/api/forecasts/stream",
+                                    json={"cities": make_route(rng, cities, route_length), "days": 5}) as r:
+                first = True
+                async for line in r.content:
+                    if first and line.strip():
+                        first_results.append(time.perf_counter() - started)
+                        first = False
+                return r.status
+
+        async def submit_form(i: int) -> int:
+            departure, *additional, destination = make_route(rng, cities, route_length)
+            form = {"departureCity": departure, "destinationCity": destination,
+                    "additionalCities": ", ".join(additional)}
+            async with session.post(f"{base_url}/", data=form, allow_redirects=False) as r:
+                await r.read()
+                return r.status
+
+        params = {"city_pool": city_pool}
+        if "api_forecast" in scenarios:
+            results.append(await run_load("api_forecast", session, upstream_url, requests, concurrency,
+                                          get_forecast, **params))
+        if "api_route" in scenarios:
+            results.append(await run_load("api_route", session, upstream_url, requests // route_length or 1,
+                                          concurrency, post_route, route_length=route_length, **params))
+        if "api_stream" in scenarios:
+            result = await run_load("api_stream", session, upstream_url, requests // route_length or 1,
+                                    concurrency, stream_route, route_length=route_length, **params)
+            first_results.sort()
+            result["first_result_p50_ms"] = round(first_results[len(first_results) // 2] * 1000, 2)
+            result["first_result_p95_ms"] = round(first_results[int(len(first_results) * 0.95) - 1] * 1000, 2)
+            results.append(result)
+        if "form_route" in scenarios:
+            results.append(await run_load("form_route", session, upstream_url, requests // route_length or 1,
+                                          concurrency, submit_form, route_length=route_length, **params))
+        if "bot_route" in scenarios:
+            upstream_before = await get_upstream_stats(session, upstream_url)
+            output = await asyncio.to_thread(subprocess.run, [
+                sys.executable, os.path.join(SRC_DIR, "benchmarks", "bench_bot.py"),
+                "--users", str(bot_users), "--weather-url", f"{base_url}/api"
+            ], check=True, capture_output=True, text=True)
+            upstream = await get_upstream_stats(session, upstream_url) - upstream_before
+            results.append({**json.loads(output.stdout.strip().splitlines()[-1]),
+                            "upstream_requests": dict(sorted(upstream.items()))})
+    return results
+
+
+async def main(args: argparse.Namespace) -> dict:
+    upstream_port, web_port = get_free_port(), get_free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    base_url = f"http://127.0.0.1:{web_port}"
+    with tempfile.TemporaryDirectory(prefix="weather-bench-") as tmp_dir:
+        env = {
+            "API_KEY": "bench",
+            "OPENWEATHER_URL": upstream_url,
+            # все города берутся из замены OpenWeather, а не из справочника и кэша прошлых запусков
+            "GAZETTEER_PATH": "",
+            "GEOCODER_CACHE_PATH": "",
+            "RESULT_STORE": "sqlite",
+            "RESULT_STORE_PATH": os.path.join(tmp_dir, "results.sqlite3"),
+            "METRICS_DIR": os.path.join(tmp_dir, "metrics"),
+        }
+        with run_process([sys.executable, "-m", "testing.fake_openweather", "--port", str(upstream_port),
+                          "--latency", str(args.latency), "--jitter", str(args.jitter),
+                          "--error-rate", str(args.error_rate)]) as upstream, \
+                run_process([sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(web_port),
+                             "--workers", str(args.workers), "--mode", args.mode], env=env) as web:
+            await wait_ready(f"{upstream_url}/stats", upstream)
+            await wait_ready(f"{base_url}/api/health", web)
+            scenarios = [scenario for scenario in args.scenarios if args.mode == "full" or scenario != "form_route"]
+            results = await run_scenarios(base_url, upstream_url, scenarios, args.requests, args.concurrency,
+                                          args.city_pool, args.route_length, args.bot_users)
+    return {
+        "params": {"workers": args.workers, "mode": args.mode, "upstream_latency": args.latency,
+                   "upstream_jitter": args.jitter, "upstream_error_rate": args.error_rate},
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--mode", choices=("full", "api"), default="full")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--city-pool", type=int, default=200, help="число разных городов в запросах")
+    parser.add_argument("--route-length", type=int, default=5)
+    parser.add_argument("--bot-users", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка замены OpenWeather, секунды")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="файл для результата, по умолчанию stdout")
+    args = parser.parse_args()
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
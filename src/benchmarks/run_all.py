@@ -0,0 +1,74 @@
+"""Запускает все бенчмарки и сохраняет общий JSON-отчет для сравнения между версиями.
+   Каждый бенчмарк выполняется отдельным процессом: у веб-сервиса и бота свои модули config.
+   Запуск из папки src: python benchmarks/run_all.py --output bench.json [--quick]"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARKS = {
+    "imports": ["bench_imports.py"],
+    "aggregation": ["bench_aggregation.py"],
+    "figures": ["bench_figures.py"],
+    "bot_stub": ["bench_bot.py"],
+    "load": ["bench_load.py", "--workers", "2"],
+}
+QUICK_ARGS = {
+    "imports": ["--repeat", "1"],
+    "aggregation": ["--sizes", "1", "100", "--repeat", "3"],
+    "figures": ["--sizes", "2", "10", "--repeat", "3"],
+    "bot_stub": ["--users", "50"],
+    "load": ["--requests", "200", "--bot-users", "30"],
+}
+
+
+def get_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(name: str, quick: bool):
+    script, *args = BENCHMARKS[name]
+    if quick:
+        args += QUICK_ARGS[name]
+    output = subprocess.run([sys.executable, os.path.join(BENCH_DIR, script), *args],
+                            cwd=os.path.dirname(BENCH_DIR), check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main(names: list[str], quick: bool) -> dict:
+    report = {
+        "revision": get_revision(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": quick,
+        "benchmarks": {},
+    }
+    for name in names:
+        print(f"running {name}", file=sys.stderr)
+        report["benchmarks"][name] = run_benchmark(name, quick)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="меньше повторов и запросов")
+    parser.add_argument("--output", help="файл для отчета, по умолчанию stdout")
+    args = parser.parse_args()
+    text = json.dumps(main(args.only, args.quick), indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
@@ -1,32 +1,125 @@
 import asyncio
 import logging
+from functools import cache
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
 from config import config
+from external_services.cache import ForecastCache
+from external_services.weather_api import WeatherApi, create_session
 from handlers.commands import router as commands_router
 from handlers.weather import router as weather_router
 from handlers.other import router as other_router
 from keyboards.set_menu import set_main_menu
+from middlewares.concurrency import ConcurrencyLimitMiddleware
+from middlewares.metrics import MetricsMiddleware
+from storages.memory import TTLMemoryStorage
+from storages.sqlite import SqliteStorage
+from utils.metrics import get_metrics
 
 
-async def run_bot():
-    logging.basicConfig(level=logging.INFO)
+def create_storage() -> BaseStorage:
+    """Создает FSM-хранилище по config.fsm_storage: memory, sqlite или redis"""
+    if config.fsm_storage == "memory":
+        return TTLMemoryStorage(ttl=config.fsm_session_ttl)
+    if config.fsm_storage == "sqlite":
+        return SqliteStorage(config.fsm_storage_path, ttl=config.fsm_session_ttl,
+                             flush_interval=config.fsm_flush_interval)
+    if config.fsm_storage == "redis":
+        # требует пакет redis, поэтому импортируется только при выборе этого хранилища
+        from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+        return RedisStorage.from_url(config.fsm_storage_url, state_ttl=int(config.fsm_session_ttl),
+                                     data_ttl=int(config.fsm_session_ttl),
+                                     key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True))
+    raise ValueError(f"Unknown FSM storage: {config.fsm_storage}")
 
-    storage = MemoryStorage()
 
-    bot = Bot(token=config.bot_token)
+def create_dispatcher(storage: BaseStorage, weather_api: WeatherApi | None = None) -> Dispatcher:
     dp = Dispatcher(storage=storage)
+    dp["weather_api"] = weather_api
+    # время апдейта включает ожидание в очереди ConcurrencyLimitMiddleware
+    dp.update.outer_middleware(MetricsMiddleware())
+    dp.update.outer_middleware(ConcurrencyLimitMiddleware(config.updates_concurrency))
 
     dp.include_router(commands_router)
     dp.include_router(weather_router)
     dp.include_router(other_router)
+    return dp
+
+
+@cache
+def get_dispatcher() -> Dispatcher:
+    """Диспетчер один на процесс: роутеры обработчиков подключаются только к одному диспетчеру.
+       При перезапуске бота супервизором сохраняются и состояния пользователей в FSM-хранилище"""
+    return create_dispatcher(create_storage())
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    """Принимает апдейты через вебхук на aiohttp-сервере. Каждый апдейт обрабатывается в отдельной задаче"""
+    await bot.set_webhook(f"{config.webhook_base_url}{config.webhook_path}",
+                          secret_token=config.webhook_secret, drop_pending_updates=True)
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, handle_in_background=True,
+                         secret_token=config.webhook_secret).register(app, path=config.webhook_path)
+    app.router.add_get("/metrics", get_metrics)
+    setup_application(app, dp, bot=bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, config.webhook_host, config.webhook_port).start()
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Отдает /metrics в режиме polling, где у бота нет своего HTTP-сервера"""
+    app = web.Application()
+    app.router.add_get("/metrics", get_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def run_bot(handle_signals: bool = True):
+    """Запускает бота до остановки. Под супервизором (main.py) сигналы обрабатывает он,
+       а бот останавливается отменой задачи"""
+    logging.basicConfig(level=logging.INFO)
+
+    bot = Bot(token=config.bot_token)
 
-    await set_main_menu(bot)
+    session = create_session(
+        limit=config.weather_api_connections_limit,
+        dns_cache_ttl=config.weather_api_dns_cache_ttl,
+        keepalive_timeout=config.weather_api_keepalive_timeout
+    )
+    cache = ForecastCache(ttl=config.weather_cache_ttl, max_size=config.weather_cache_size)
+    dp = get_dispatcher()
+    dp["weather_api"] = WeatherApi(session, cache=cache)
 
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    metrics_runner = None
+    try:
+        await set_main_menu(bot)
+        if config.bot_mode == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            if config.metrics_port:
+                metrics_runner = await start_metrics_server(config.metrics_host, config.metrics_port)
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot, handle_signals=handle_signals)
+    finally:
+        # aiogram не закрывает хранилище, а диспетчер общий, поэтому записи только сбрасываются
+        if isinstance(dp.storage, SqliteStorage):
+            await dp.storage.flush()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await session.close()
+        await bot.session.close()
 
 
 if __name__ == "__main__":
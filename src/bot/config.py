@@ -8,6 +8,28 @@ class Config:
         if env_file:
             load_dotenv()
         self.bot_token = os.getenv("BOT_TOKEN")
+        self.weather_api_connections_limit = int(os.getenv("WEATHER_API_CONNECTIONS_LIMIT", 100))
+        self.weather_api_dns_cache_ttl = int(os.getenv("WEATHER_API_DNS_CACHE_TTL", 300))
+        self.weather_api_keepalive_timeout = float(os.getenv("WEATHER_API_KEEPALIVE_TIMEOUT", 30))
+        self.weather_cache_ttl = float(os.getenv("WEATHER_CACHE_TTL", 600))
+        self.weather_cache_size = int(os.getenv("WEATHER_CACHE_SIZE", 1024))
+        self.fsm_session_ttl = float(os.getenv("FSM_SESSION_TTL", 24 * 3600))
+        self.fsm_storage = os.getenv("FSM_STORAGE", "memory")
+        self.fsm_storage_path = os.getenv("FSM_STORAGE_PATH", "fsm.sqlite3")
+        self.fsm_storage_url = os.getenv("FSM_STORAGE_URL", "redis://localhost:6379/0")
+        self.fsm_flush_interval = float(os.getenv("FSM_FLUSH_INTERVAL", 0.05))
+        self.updates_concurrency = int(os.getenv("UPDATES_CONCURRENCY", 100))
+        self.bot_mode = os.getenv("BOT_MODE", "polling")
+        self.webhook_base_url = os.getenv("WEBHOOK_BASE_URL", "")
+        self.webhook_path = os.getenv("WEBHOOK_PATH", "/webhook")
+        self.webhook_secret = os.getenv("WEBHOOK_SECRET") or None
+        self.webhook_host = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+        self.webhook_port = int(os.getenv("WEBHOOK_PORT", 8080))
+        self.metrics_host = os.getenv("BOT_METRICS_HOST", "127.0.0.1")
+        self.metrics_port = int(os.getenv("BOT_METRICS_PORT", 0))
+        # иначе set_webhook отклоняется Telegram при каждом запуске, и супервизор бесконечно перезапускает бота
+        if self.bot_mode == "webhook" and not self.webhook_base_url.startswith("https://"):
+            raise ValueError("BOT_MODE=webhook requires WEBHOOK_BASE_URL with the public https:// address of the bot")
 
 
 config = Config()
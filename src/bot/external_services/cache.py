@@ -0,0 +1,79 @@
+import asyncio
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from utils.metrics import CACHE_LOOKUPS
+
+
+def normalize_city(city: str) -> str:
+    """Приводит название города к ключу кэша: NFKC, регистр, лишние пробелы"""
+    city = unicodedata.normalize("NFKC", city)
+    return " ".join(city.split()).casefold()
+
+
+class ForecastCache:
+    """LRU-кэш полных 5-дневных прогнозов по названию города с TTL.
+       Одновременные запросы одного города ждут одну и ту же задачу загрузки"""
+
+    def __init__(self, ttl: float = 600, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[list[dict] | None, float]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Task] = {}
+
+    async def get_or_fetch(self, city: str,
+                           fetch: Callable[[], Awaitable[list[dict] | None]]) -> list[dict] | None:
+        key = normalize_city(city)
+        entry = self._data.get(key)
+        if entry is not None and entry[1] >= time.monotonic():
+            self._data.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.inc(result="hit")
+            return entry[0]
+        self.misses += 1
+        CACHE_LOOKUPS.inc(result="miss")
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_set(key, fetch))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._on_fetch_done(key, t))
+        # shield: отмена одного ожидающего не должна отменять загрузку для остальных
+        return await asyncio.shield(task)
+
+    def get(self, city: str) -> list[dict] | None:
+        """Возвращает прогноз из кэша без загрузки (None, если записи нет или город не найден)"""
+        entry = self._data.get(normalize_city(city))
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def contains(self, city: str) -> bool:
+        """Есть ли прогноз в кэше или уже идет его загрузка"""
+        key = normalize_city(city)
+        entry = self._data.get(key)
+        return key in self._in_flight or (entry is not None and entry[1] >= time.monotonic())
+
+    def set(self, city: str, forecast: list[dict] | None) -> None:
+        """Сохраняет прогноз, полученный в обход get_or_fetch (например, из потокового ответа по маршруту)"""
+        self._store(normalize_city(city), forecast)
+
+    def _on_fetch_done(self, key: str, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        if not task.cancelled():
+            # помечает исключение как полученное, даже если все ожидающие были отменены
+            task.exception()
+
+    async def _fetch_and_set(self, key: str, fetch: Callable[[], Awaitable[list[dict] | None]]) -> list[dict] | None:
+        forecast = await fetch()
+        self._store(key, forecast)
+        return forecast
+
+    def _store(self, key: str, forecast: list[dict] | None) -> None:
+        self._data[key] = (forecast, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
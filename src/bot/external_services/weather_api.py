@@ -1,32 +1,190 @@
 import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
 from pprint import pprint
+from typing import AsyncIterator, Awaitable
 
 import aiohttp
+from aiohttp import ClientConnectionError
 from aiohttp.web_exceptions import HTTPServiceUnavailable
 
+from external_services.cache import ForecastCache
+from utils.metrics import WEATHER_API_REQUEST_DURATION, WEATHER_API_REQUESTS
+
+
+def create_session(limit: int = 100, dns_cache_ttl: int = 300, keepalive_timeout: float = 30) -> aiohttp.ClientSession:
+    """Создает долгоживущую сессию с пулом keep-alive соединений и кэшем DNS.
+       Должна создаваться внутри запущенного event loop и закрываться при остановке бота"""
+    connector = aiohttp.TCPConnector(limit=limit, ttl_dns_cache=dns_cache_ttl, keepalive_timeout=keepalive_timeout)
+    return aiohttp.ClientSession(connector=connector)
+
 
 class WeatherApi:
-    base_url = "http://127.0.0.1:5000/api/forecasts"
+    base_url = "http://127.0.0.1:5000/api"
+
+    def __init__(self, session: aiohttp.ClientSession, cache: ForecastCache | None = None,
+                 base_url: str | None = None):
+        self.session = session
+        if base_url is not None:
+            self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self._prefetch_tasks: set[asyncio.Task] = set()
 
     async def get_weather_for(self, city: str, days: int = 5, timeout: int = 5) -> list[dict] | None:
         """Возвращает прогноз на заданное количество дней, если город найден. Иначе None.
            Выбрасывает ValueError, если передано некорректное число дней,
                        TimeoutError, если превышено время ожидания,
                        ClientConnectionError, если произошла другая ошибка при подключении
-                       HTTPServiceUnavailable, если сервис погоды не может получить данные"""
+                       HTTPServiceUnavailable, если сервис погоды не может получить данные или ответил ошибкой"""
         if not (1 <= days <= 5):
             raise ValueError("Days must be between 1 and 5")
-        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(timeout)) as session:
-            async with session.get(f"{self.base_url}/{city}?days={days}") as r:
-                if r.status == 404:
-                    return None
-                if r.status == 503:
+        if self.cache is None:
+            return await self._request_weather(city, days, timeout)
+        forecast = await self.cache.get_or_fetch(city, lambda: self._request_weather(city, 5, timeout))
+        if forecast is None:
+            return None
+        return forecast[:days]
+
+    async def _request_weather(self, city: str, days: int, timeout: int) -> list[dict] | None:
+        async with self._request("forecast", "GET", f"{self.base_url}/forecasts/{city}", params={"days": days},
+                                 timeout=aiohttp.ClientTimeout(timeout)) as r:
+            if r.status == 404:
+                return None
+            # остальные ошибки сервиса (400, 500) для пользователя означают то же, что и 503
+            if r.status != 200:
+                raise HTTPServiceUnavailable
+            return await r.json()
+
+    async def city_exists(self, city: str, timeout: int = 5) -> bool:
+        """Проверяет, найден ли город, не запрашивая прогноз.
+           Выбрасывает те же исключения, что и get_weather_for"""
+        if self.cache is not None and self.cache.get(city) is not None:
+            return True
+        async with self._request("city", "GET", f"{self.base_url}/cities/{city}",
+                                 timeout=aiohttp.ClientTimeout(timeout)) as r:
+            if r.status == 404:
+                return False
+            # как в _request_weather: город, который не удалось проверить, не добавляется в маршрут
+            if r.status != 200:
+                raise HTTPServiceUnavailable
+            return True
+
+    async def suggest_cities(self, prefix: str, limit: int = 3, timeout: int = 2) -> list[str]:
+        """Возвращает названия городов из справочника сервиса, начинающиеся с prefix.
+           Подсказки необязательны, поэтому при любой ошибке возвращается пустой список"""
+        try:
+            async with self._request("suggestions", "GET", f"{self.base_url}/cities",
+                                     params={"q": prefix, "limit": limit}, timeout=aiohttp.ClientTimeout(timeout)) as r:
+                if r.status != 200:
+                    return []
+                r_json = await r.json()
+        except (TimeoutError, aiohttp.ClientError):
+            return []
+        return [city["name"] for city in r_json["cities"]]
+
+    def prefetch(self, city: str) -> None:
+        """Запускает загрузку полного прогноза в фоне. Результат попадает в кэш,
+           и последующий get_weather_for дождется уже идущей загрузки вместо нового запроса"""
+        if self.cache is None:
+            return
+        task = asyncio.create_task(self.get_weather_for(city))
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._on_prefetch_done)
+
+    def _on_prefetch_done(self, task: asyncio.Task) -> None:
+        self._prefetch_tasks.discard(task)
+        if not task.cancelled():
+            # ошибка будет получена повторно при ожидании прогноза в обработчике
+            task.exception()
+
+    async def stream_weather_for_route(self, cities: list[str], days: int = 5,
+                                       timeout: int = 15) -> AsyncIterator[list[tuple[int, list[dict] | None]]]:
+        """Отдает прогнозы городов маршрута по мере готовности: списки пар (индекс города в маршруте, прогноз или None),
+           в каждый попадают все прогнозы, готовые к моменту запроса.
+           Города, которые уже есть в кэше или загружаются (prefetch), берутся из кэша,
+           остальные запрашиваются одним потоковым запросом и сохраняются в кэш.
+           Выбрасывает те же исключения, что и get_weather_for"""
+        if not (1 <= days <= 5):
+            raise ValueError("Days must be between 1 and 5")
+        queue: asyncio.Queue[tuple[int | None, list[dict] | None | Exception]] = asyncio.Queue()
+        tasks = []
+        streamed = []
+        for i, city in enumerate(cities):
+            if self.cache is not None and self.cache.contains(city):
+                tasks.append(asyncio.create_task(self._put_result(queue, i, self.get_weather_for(city, days))))
+            else:
+                streamed.append((i, city))
+        if streamed:
+            tasks.append(asyncio.create_task(self._stream_route(queue, streamed, days, timeout)))
+        try:
+            remaining = len(cities)
+            while remaining:
+                batch = [await queue.get()]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                for _, result in batch:
+                    if isinstance(result, Exception):
+                        raise result
+                remaining -= len(batch)
+                yield batch
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    async def _put_result(queue: asyncio.Queue, i: int, forecast: Awaitable[list[dict] | None]) -> None:
+        try:
+            queue.put_nowait((i, await forecast))
+        except Exception as e:
+            queue.put_nowait((i, e))
+
+    async def _stream_route(self, queue: asyncio.Queue, cities: list[tuple[int, str]], days: int,
+                            timeout: int) -> None:
+        """Читает NDJSON-ответ /forecasts/stream построчно. Запрашиваются прогнозы на 5 дней, как в get_weather_for,
+           чтобы в кэше были полные прогнозы"""
+        received = 0
+        try:
+            async with self._request("route_stream", "POST", f"{self.base_url}/forecasts/stream",
+                                     json={"cities": [city for _, city in cities], "days": 5},
+                                     timeout=aiohttp.ClientTimeout(timeout)) as r:
+                # ошибку сервиса, например 400 на слишком длинный маршрут, пользователь видит как недоступность
+                if r.status != 200:
                     raise HTTPServiceUnavailable
-                return await r.json()
+                async for line in r.content:
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    if result["status"] == 503:
+                        raise HTTPServiceUnavailable
+                    i, city = cities[result["index"]]
+                    forecast = result.get("forecast")
+                    if self.cache is not None:
+                        self.cache.set(city, forecast)
+                    queue.put_nowait((i, forecast[:days] if forecast else None))
+                    received += 1
+            if received < len(cities):
+                raise ClientConnectionError("Forecast stream ended before all cities were received")
+        except Exception as e:
+            queue.put_nowait((None, e))
+
+    @asynccontextmanager
+    async def _request(self, name: str, method: str, url: str, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Запрос к сервису погоды. Время, включая чтение ответа, и статус учитываются в метриках под именем name"""
+        status = "error"
+        started = time.perf_counter()
+        try:
+            async with self.session.request(method, url, **kwargs) as r:
+                status = r.status
+                yield r
+        finally:
+            WEATHER_API_REQUEST_DURATION.observe(time.perf_counter() - started, method=name)
+            WEATHER_API_REQUESTS.inc(method=name, status=status)
 
 
 async def test_weather_api():
-    pprint(await WeatherApi().get_weather_for("Москва", 5))
+    async with create_session() as session:
+        pprint(await WeatherApi(session).get_weather_for("Москва", 5))
 
 
 if __name__ == "__main__":
@@ -1,7 +1,6 @@
 from aiogram import Router
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import default_state
 from aiogram.types import Message, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
@@ -37,4 +36,4 @@ async def process_weather_command(message: Message, state: FSMContext):
 @router.message(Command(commands="cancel"))
 async def process_cancel_command(message: Message, state: FSMContext):
     await message.answer(text=LEXICON_RU["command_cancel"])
-    await state.set_state(default_state)
+    await state.clear()
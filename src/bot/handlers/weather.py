@@ -1,12 +1,15 @@
 from aiogram import Router, F
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import default_state
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiohttp.client_exceptions import ClientConnectionError
 
+import asyncio
+import logging
+import time
 from asyncio.exceptions import TimeoutError
+from contextlib import aclosing
 
 from aiohttp.web_exceptions import HTTPServiceUnavailable
 
@@ -14,8 +17,12 @@ from external_services.weather_api import WeatherApi
 from keyboards.inline import get_confirm_kb
 from states.states import FSMWeatherForm
 from lexicons.ru import LEXICON_RU
+from utils.messages import answer_texts, answer_with_retry
+from utils.metrics import FIRST_FORECAST_DURATION, FULL_FORECAST_DURATION
 
 
+logger = logging.getLogger(__name__)
+
 router = Router()
 router.message.filter(StateFilter(FSMWeatherForm))
 
@@ -30,31 +37,27 @@ async def process_forecast_range_input(callback: CallbackQuery, state: FSMContex
 
 
 @router.message(StateFilter(FSMWeatherForm.fill_departure_city), F.text)
-async def process_departure_city_input(message: Message, state: FSMContext):
-    """Сохраняет прогноз для города отправления, если его удалось получить, иначе запрашивает повторную попытку.
-       Сохраняет маршрут (с одной точкой).
+async def process_departure_city_input(message: Message, state: FSMContext, weather_api: WeatherApi):
+    """Проверяет город отправления и, если он найден, начинает с него маршрут, иначе запрашивает повторную попытку.
        Запрашивает ввод точки назначения, если успешно"""
-    forecast = await process_city_input_and_get_forecast(message, state)
-    if forecast is None:
+    if not await process_city_input(message, state, weather_api):
         return
     city = message.text
-    await state.update_data({city: forecast, "route": [city]})
+    await state.update_data({"route": [city]})
     await message.answer(LEXICON_RU["fill_destination_city"])
     await state.set_state(FSMWeatherForm.fill_destination_city)
 
 
 @router.message(StateFilter(FSMWeatherForm.fill_destination_city), F.text)
-async def process_destination_city_input(message: Message, state: FSMContext):
-    """Сохраняет прогноз для города назначения, если его удалось получить, иначе запрашивает повторную попытку.
-       Сохраняет маршрут (с одной точкой).
-       Показывает меню подтверждения прогноза, если успешно"""
-    forecast = await process_city_input_and_get_forecast(message, state)
-    if forecast is None:
+async def process_destination_city_input(message: Message, state: FSMContext, weather_api: WeatherApi):
+    """Проверяет город назначения и, если он найден, добавляет его в конец маршрута,
+       иначе запрашивает повторную попытку. Показывает меню подтверждения прогноза, если успешно"""
+    if not await process_city_input(message, state, weather_api):
         return
     city = message.text
     route = await state.get_value("route")
     route.append(city)
-    await state.update_data({"route": route, city: forecast})
+    await state.update_data({"route": route})
     await message.answer(LEXICON_RU["confirm"], reply_markup=get_confirm_kb())
     await state.set_state(FSMWeatherForm.confirm)
 
@@ -81,17 +84,15 @@ async def process_new_point_option(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(StateFilter(FSMWeatherForm.fill_additional_city), F.text)
-async def process_additional_city_input(message: Message, state: FSMContext):
-    """Сохраняет прогноз для города назначения, если его удалось получить, иначе запрашивает повторную попытку.
-           Сохраняет маршрут (с одной точкой).
-           Показывает меню подтверждения прогноза, если успешно"""
-    forecast = await process_city_input_and_get_forecast(message, state)
-    if forecast is None:
+async def process_additional_city_input(message: Message, state: FSMContext, weather_api: WeatherApi):
+    """Проверяет промежуточный город и, если он найден, добавляет его в маршрут перед точкой назначения,
+       иначе запрашивает повторную попытку. Показывает меню подтверждения прогноза, если успешно"""
+    if not await process_city_input(message, state, weather_api):
         return
     route = await state.get_value("route")
     city = message.text
     route.insert(-1, city)
-    await state.update_data({"route": route, city: forecast})
+    await state.update_data({"route": route})
     await message.answer(text=LEXICON_RU["additional_city_success"])
     await message.answer(LEXICON_RU["confirm"], reply_markup=get_confirm_kb())
     await state.set_state(FSMWeatherForm.confirm)
@@ -107,48 +108,91 @@ async def process_back_to_confirm_option(callback: CallbackQuery, state: FSMCont
 
 
 @router.callback_query(StateFilter(FSMWeatherForm.confirm), F.data == "confirm")
-async def process_confirm_view(callback: CallbackQuery, state: FSMContext):
-    """Показывает прогноз и очищает состояние"""
+async def process_confirm_view(callback: CallbackQuery, state: FSMContext, weather_api: WeatherApi):
+    """Показывает прогноз и очищает состояние.
+       Прогнозы не хранятся в состоянии: они берутся из общего кэша WeatherApi, заполненного при вводе городов,
+       а недостающие приходят потоком по мере готовности. Города отправляются в порядке маршрута, как только готовы
+       они и все предыдущие; готовые вместе короткие города объединяются в общие сообщения"""
+    started = time.perf_counter()
     await callback.answer()
-    await callback.message.edit_text(text=LEXICON_RU["forecast_begin"])
     data = await state.get_data()
-    for i, city in enumerate(data["route"], start=1):
-        days_forecasts_texts = []
-        for day in range(data["days"]):
-            forecast = data[city][day]
-            forecast_text = LEXICON_RU["forecast_day"].format(
-                date=forecast["date"],
-                temp=forecast["temperature"],
-                wind=forecast["wind_speed"],
-                pop=forecast["probability_of_precipitation"] * 100,
-            )
-            days_forecasts_texts.append(forecast_text)
-        text = LEXICON_RU["forecast_city"].format(
-            i=i,
-            city=city.capitalize(),
-            forecast="\n\n".join(days_forecasts_texts)
+    route = data["route"]
+    # редактирование старого сообщения не влияет на порядок новых, поэтому идет параллельно с отправкой
+    edit_begin = asyncio.ensure_future(callback.message.edit_text(text=LEXICON_RU["forecast_begin"]))
+    ready: dict[int, str] = {}
+    sent = 0
+    messages_count = 0
+    failed = False
+    try:
+        # aclosing: при ошибке отправки незавершенные загрузки отменяются сразу
+        async with aclosing(weather_api.stream_weather_for_route(route, data["days"])) as forecasts:
+            async for batch in forecasts:
+                for i, city_forecast in batch:
+                    ready[i] = format_city_forecast(i + 1, route[i], city_forecast or [])
+                texts = []
+                while sent in ready:
+                    texts.append(ready.pop(sent))
+                    sent += 1
+                if not texts:
+                    continue
+                if messages_count == 0:
+                    FIRST_FORECAST_DURATION.observe(time.perf_counter() - started)
+                messages_count += await answer_texts(callback.message, texts, parse_mode="html")
+    except (TimeoutError, ClientConnectionError, HTTPServiceUnavailable):
+        failed = True
+    finally:
+        # редактирование дожидается на любом пути, в том числе при неожиданной ошибке
+        await edit_begin
+    if failed:
+        # сообщение с меню подтверждения уже заменено, поэтому меню отправляется заново: можно повторить или отменить
+        await callback.message.answer(LEXICON_RU["weather_service_error"])
+        await callback.message.answer(LEXICON_RU["confirm"], reply_markup=get_confirm_kb())
+        return
+    await answer_with_retry(callback.message, LEXICON_RU["finished_forecast"])
+    await state.clear()
+    elapsed = time.perf_counter() - started
+    FULL_FORECAST_DURATION.observe(elapsed)
+    logger.info("time_to_full_forecast=%.3fs cities=%d messages=%d", elapsed, len(route), messages_count + 1)
+
+
+def format_city_forecast(i: int, city: str, city_forecast: list[dict]) -> str:
+    days_forecasts_texts = []
+    for forecast in city_forecast:
+        forecast_text = LEXICON_RU["forecast_day"].format(
+            date=forecast["date"],
+            temp=forecast["temperature"],
+            wind=forecast["wind_speed"],
+            pop=forecast["probability_of_precipitation"] * 100,
         )
-        await callback.message.answer(text=text, parse_mode="html")
-    await callback.message.answer(LEXICON_RU["finished_forecast"])
-    await state.set_state(default_state)
+        days_forecasts_texts.append(forecast_text)
+    return LEXICON_RU["forecast_city"].format(
+        i=i,
+        city=city.capitalize(),
+        forecast="\n\n".join(days_forecasts_texts)
+    )
 
 
-async def process_city_input_and_get_forecast(message: Message, state: FSMContext) -> list[dict] | None:
-    """Обрабатывает ввод города: проверяет, найден ли он и нет ли его уже в маршруте.
-       В случае ошибки отправляет сообщение, в случае успеха возвращает прогноз"""
-    weather_api = WeatherApi()
+async def process_city_input(message: Message, state: FSMContext, weather_api: WeatherApi) -> bool:
+    """Обрабатывает ввод города: проверяет, нет ли его уже в маршруте и найден ли он.
+       Прогноз для города сразу начинает загружаться в фоне и понадобится только при показе прогноза.
+       В случае ошибки отправляет сообщение и возвращает False"""
     city = message.text
-    days = await state.get_value("days", 5)
-    try:
-        forecast = await weather_api.get_weather_for(city=city, days=days)
-    except (TimeoutError, ClientConnectionError, HTTPServiceUnavailable):
-        await message.answer(LEXICON_RU["weather_service_error"])
-        return
-    if forecast is None:
-        await message.answer(LEXICON_RU["city_not_found_error"])
-        return
     route = await state.get_value("route", [])
     if city.lower() in [c.lower() for c in route]:
         await message.answer(LEXICON_RU["city_repeat_error"])
-        return
-    return forecast
+        return False
+    weather_api.prefetch(city)
+    try:
+        city_exists = await weather_api.city_exists(city)
+    except (TimeoutError, ClientConnectionError, HTTPServiceUnavailable):
+        await message.answer(LEXICON_RU["weather_service_error"])
+        return False
+    if not city_exists:
+        text = LEXICON_RU["city_not_found_error"]
+        # по началу названия: опечатка чаще всего в конце
+        suggestions = await weather_api.suggest_cities(city[:3])
+        if suggestions:
+            text += "\n\n" + LEXICON_RU["city_suggestions"].format(", ".join(suggestions))
+        await message.answer(text)
+        return False
+    return True
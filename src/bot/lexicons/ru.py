@@ -30,6 +30,8 @@ LEXICON_RU = {
 
     "city_not_found_error": """Город не найден :( Проверь правильность и попробуй еще раз""",
 
+    "city_suggestions": """Возможно, ты имел в виду: {}""",
+
     "confirm": """Почти готово! Хочешь ли ты добавить промежуточные точки или просмотреть маршрут целиком?""",
 
     "view_route": """Текущий маршрут:
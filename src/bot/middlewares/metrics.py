@@ -0,0 +1,24 @@
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import UPDATE_DURATION, UPDATES
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Учитывает время обработки апдейтов и ошибки обработчиков по типу события (message, callback_query...)"""
+
+    async def __call__(self, handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: dict[str, Any]) -> Any:
+        event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        started = time.perf_counter()
+        result = "error"
+        try:
+            response = await handler(event, data)
+            result = "ok"
+            return response
+        finally:
+            UPDATE_DURATION.observe(time.perf_counter() - started, event_type=event_type)
+            UPDATES.inc(event_type=event_type, result=result)
@@ -0,0 +1,66 @@
+import time
+from copy import copy
+from typing import Any
+
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+
+class TTLMemoryStorage(MemoryStorage):
+    """MemoryStorage, который не создает записи при чтении, удаляет пустые записи
+       и вычищает сессии, к которым не обращались дольше ttl секунд"""
+
+    def __init__(self, ttl: float = 24 * 3600, sweep_interval: float = 60):
+        super().__init__()
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_access: dict[StorageKey, float] = {}
+        self._last_sweep = time.monotonic()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await super().set_state(key, state)
+        self._touch(key)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        self._sweep()
+        record = self.storage.get(key)
+        if record is None:
+            return None
+        self._touch(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        await super().set_data(key, data)
+        self._touch(key)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = self.storage.get(key)
+        if record is None:
+            return {}
+        return record.data.copy()
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Any | None = None) -> Any | None:
+        record = self.storage.get(storage_key)
+        if record is None:
+            return default
+        return copy(record.data.get(dict_key, default))
+
+    def _touch(self, key: StorageKey) -> None:
+        record = self.storage.get(key)
+        if record is None:
+            return
+        if record.state is None and not record.data:
+            del self.storage[key]
+            self._last_access.pop(key, None)
+            return
+        self._last_access[key] = time.monotonic()
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        expired = [key for key, last_access in self._last_access.items() if now - last_access > self.ttl]
+        for key in expired:
+            self.storage.pop(key, None)
+            del self._last_access[key]
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteStorage(BaseStorage):
+    """FSM-хранилище в локальном SQLite-файле, переживающее перезапуск бота.
+       Записи копятся в памяти и сбрасываются в базу пачкой раз в flush_interval секунд
+       (или сразу при batch_size изменениях); чтение учитывает еще не сброшенные записи.
+       Сессии, не менявшиеся дольше ttl секунд, удаляются при сбросе"""
+
+    def __init__(self, path: str, ttl: float = 24 * 3600, flush_interval: float = 0.05,
+                 batch_size: int = 100, key_builder: KeyBuilder | None = None):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._pending: dict[str, tuple[str | None, dict[str, Any]]] = {}
+        self._flushing: dict[str, tuple[str | None, dict[str, Any]]] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._background_tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fsm ("
+                "key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS fsm_updated_at ON fsm (updated_at)")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        db_key = self.key_builder.build(key)
+        _, data = await self._read(db_key)
+        self._write(db_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._read(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        db_key = self.key_builder.build(key)
+        state, _ = await self._read(db_key)
+        self._write(db_key, state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._read(self.key_builder.build(key))
+        return data.copy()
+
+    async def flush(self) -> None:
+        """Сбрасывает в базу все накопленные записи, не закрывая хранилище"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        await self._flush()
+
+    async def close(self) -> None:
+        await self.flush()
+        self._conn.close()
+
+    async def _read(self, db_key: str) -> tuple[str | None, dict[str, Any]]:
+        record = self._pending.get(db_key) or self._flushing.get(db_key)
+        if record is not None:
+            return record
+        return await asyncio.to_thread(self._select, db_key)
+
+    def _write(self, db_key: str, state: str | None, data: dict[str, Any]) -> None:
+        self._pending[db_key] = (state, data)
+        if len(self._pending) >= self.batch_size:
+            task = asyncio.create_task(self._flush())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._flushing.update(batch)
+        try:
+            await asyncio.to_thread(self._save, batch)
+        except Exception:
+            # записи, не измененные за время сброса, вернутся в базу со следующим сбросом
+            logger.exception("Failed to save %d FSM records", len(batch))
+            for db_key, record in batch.items():
+                self._pending.setdefault(db_key, record)
+        finally:
+            for db_key, record in batch.items():
+                if self._flushing.get(db_key) is record:
+                    del self._flushing[db_key]
+
+    def _select(self, db_key: str) -> tuple[str | None, dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT state, data FROM fsm WHERE key = ? AND updated_at >= ?",
+                                     (db_key, time.time() - self.ttl)).fetchone()
+        if row is None:
+            return None, {}
+        return row[0], json.loads(row[1])
+
+    def _save(self, batch: dict[str, tuple[str | None, dict[str, Any]]]) -> None:
+        now = time.time()
+        upserts = [(db_key, state, json.dumps(data, ensure_ascii=False), now)
+                   for db_key, (state, data) in batch.items() if state is not None or data]
+        deletes = [(db_key,) for db_key, (state, data) in batch.items() if state is None and not data]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET state = excluded.state, data = excluded.data, "
+                "updated_at = excluded.updated_at",
+                upserts
+            )
+            self._conn.executemany("DELETE FROM fsm WHERE key = ?", deletes)
+            self._conn.execute("DELETE FROM fsm WHERE updated_at < ?", (now - self.ttl,))
@@ -0,0 +1,72 @@
+import asyncio
+import itertools
+from datetime import datetime
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import EditMessageText, GetMe, SendMessage, TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+
+class FakeTelegramSession(BaseSession):
+    """Сессия Bot API без сети: запоминает вызванные методы и возвращает правдоподобные ответы.
+       latency имитирует задержку ответа Telegram"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.requests: list[TelegramMethod] = []
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.requests.append(method)
+        if isinstance(method, (SendMessage, EditMessageText)):
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id or 0, type="private"),
+                text=method.text
+            )
+        if isinstance(method, GetMe):
+            return User(id=1, is_bot=True, first_name="WeatherBot", username="weather_bot")
+        return True
+
+    async def stream_content(self, url: str, headers: dict[str, Any] | None = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeUser:
+    """Пользователь, от имени которого в диспетчер подаются апдейты"""
+
+    _update_ids = itertools.count(1)
+
+    def __init__(self, user_id: int):
+        self.user = User(id=user_id, is_bot=False, first_name=f"User{user_id}")
+        self.chat = Chat(id=user_id, type="private")
+
+    def message(self, text: str) -> Update:
+        return Update(update_id=next(self._update_ids), message=self._make_message(text))
+
+    def callback(self, data: str) -> Update:
+        return Update(update_id=next(self._update_ids), callback_query=CallbackQuery(
+            id=str(next(self._update_ids)),
+            from_user=self.user,
+            chat_instance=str(self.chat.id),
+            message=self._make_message("..."),
+            data=data
+        ))
+
+    def _make_message(self, text: str) -> Message:
+        return Message(message_id=next(self._update_ids), date=datetime.now(), chat=self.chat,
+                       from_user=self.user, text=text)
+
+
+def create_fake_bot(latency: float = 0.0) -> Bot:
+    return Bot(token="42:FAKE", session=FakeTelegramSession(latency))
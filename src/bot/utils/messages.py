@@ -0,0 +1,43 @@
+import asyncio
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message
+
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+def pack_texts(texts: list[str], limit: int = TELEGRAM_MESSAGE_LIMIT, separator: str = "\n\n") -> list[str]:
+    """Склеивает подряд идущие тексты в как можно меньшее число сообщений не длиннее limit.
+       Порядок текстов сохраняется, отдельный текст никогда не разрезается"""
+    messages = []
+    current = ""
+    for text in texts:
+        if current and len(current) + len(separator) + len(text) <= limit:
+            current = f"{current}{separator}{text}"
+            continue
+        if current:
+            messages.append(current)
+        current = text
+    if current:
+        messages.append(current)
+    return messages
+
+
+async def answer_with_retry(message: Message, text: str, max_retries: int = 3, **kwargs) -> Message:
+    """Отправляет сообщение в чат, выжидая retry_after при превышении лимитов Telegram"""
+    for attempt in range(max_retries + 1):
+        try:
+            return await message.answer(text=text, **kwargs)
+        except TelegramRetryAfter as e:
+            if attempt == max_retries:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+async def answer_texts(message: Message, texts: list[str], **kwargs) -> int:
+    """Отправляет тексты по порядку, объединив короткие в общие сообщения. Возвращает число сообщений"""
+    packed = pack_texts(texts)
+    for text in packed:
+        await answer_with_retry(message, text, **kwargs)
+    return len(packed)
@@ -0,0 +1,122 @@
+"""Счетчики и гистограммы бота в формате Prometheus.
+   Бот работает в одном процессе, поэтому, в отличие от веб-сервиса, снимки воркеров не объединяются"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+
+from aiohttp import web
+
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels((*self.labelnames, 'le'), (*key, bound))} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        self._metrics.append(Counter(name, documentation, labelnames))
+        return self._metrics[-1]
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        self._metrics.append(Histogram(name, documentation, labelnames, buckets))
+        return self._metrics[-1]
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {'counter' if isinstance(metric, Counter) else 'histogram'}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+async def get_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=registry.render(), headers={"Content-Type": METRICS_CONTENT_TYPE})
+
+
+registry = Registry()
+
+UPDATE_DURATION = registry.histogram(
+    "bot_update_duration_seconds", "Время обработки апдейта Telegram", ("event_type",)
+)
+UPDATES = registry.counter(
+    "bot_updates_total", "Обработанные апдейты Telegram по результату", ("event_type", "result")
+)
+WEATHER_API_REQUEST_DURATION = registry.histogram(
+    "bot_weather_api_request_duration_seconds", "Время запроса к сервису погоды", ("method",)
+)
+WEATHER_API_REQUESTS = registry.counter(
+    "bot_weather_api_requests_total", "Запросы к сервису погоды по статусу ответа или ошибке", ("method", "status")
+)
+CACHE_LOOKUPS = registry.counter(
+    "bot_cache_lookups_total", "Обращения к кэшу прогнозов бота", ("result",)
+)
+FIRST_FORECAST_DURATION = registry.histogram(
+    "bot_first_forecast_duration_seconds", "Время от подтверждения маршрута до отправки первого города"
+)
+FULL_FORECAST_DURATION = registry.histogram(
+    "bot_full_forecast_duration_seconds", "Время от подтверждения маршрута до отправки всего прогноза"
+)
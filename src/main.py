@@ -1,18 +1,152 @@
+"""Запуск веб-сервиса и бота под общим супервизором.
+   Веб-сервис (app/serve.py) работает отдельным процессом с WEB_WORKERS воркерами, бот - в этом процессе
+   и стартует, только когда веб-сервис отвечает на /api/health. Упавший сервис перезапускается
+   с экспоненциальной задержкой, SIGTERM и SIGINT останавливают оба сервиса"""
+import asyncio
+import importlib
+import logging
 import os
+import signal
+import sys
+import time
+from typing import Awaitable, Callable
 
-from multiprocessing import Process
+import aiohttp
+from dotenv import load_dotenv
 
 
-def run_script(script_name):
-    os.system(f"python {script_name}")
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(SRC_DIR, "app")
+BOT_DIR = os.path.join(SRC_DIR, "bot")
+SHUTDOWN_TIMEOUT = 10
+READY_POLL_INTERVAL = 0.1
 
+logger = logging.getLogger("supervisor")
 
-if __name__ == '__main__':
-    process1 = Process(target=run_script, args=('app/app.py',))
-    process2 = Process(target=run_script, args=('bot/bot.py',))
 
-    process1.start()
-    process2.start()
+class Config:
+    def __init__(self, env_file: str = ".env"):
+        if env_file:
+            load_dotenv()
+        self.web_host = os.getenv("WEB_HOST", "127.0.0.1")
+        self.web_port = int(os.getenv("WEB_PORT", 5000))
+        self.web_workers = int(os.getenv("WEB_WORKERS", 1))
+        self.web_ready_timeout = float(os.getenv("WEB_READY_TIMEOUT", 60))
+        self.restart_backoff = float(os.getenv("RESTART_BACKOFF", 0.5))
+        self.restart_backoff_max = float(os.getenv("RESTART_BACKOFF_MAX", 30))
+        self.restart_reset_after = float(os.getenv("RESTART_RESET_AFTER", 60))
+
+
+class Supervisor:
+    def __init__(self, config: Config):
+        self.config = config
+        self.web_process: asyncio.subprocess.Process | None = None
+        self._stopping = asyncio.Event()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except NotImplementedError:
+                # Windows: остановка по Ctrl+C через KeyboardInterrupt
+                pass
+
+        started = time.monotonic()
+        web_task = asyncio.create_task(self._keep_running("web", self._run_web))
+        # бот импортируется, пока веб-сервис загружается
+        sys.path.insert(0, BOT_DIR)
+        try:
+            bot_module = importlib.import_module("bot")
+        except Exception:
+            # например, ошибка в настройках бота: веб-сервис еще не запущен, и его задача завершается сама,
+            # а не отменяется посреди запуска процесса
+            self.stop()
+            await web_task
+            raise
+        bot_task = None
+        if await self._wait_web_ready():
+            logger.info("Web service is ready in %.2fs", time.monotonic() - started)
+            bot_task = asyncio.create_task(
+                self._keep_running("bot", lambda: bot_module.run_bot(handle_signals=False))
+            )
+
+        await self._stopping.wait()
+        if bot_task is not None:
+            bot_task.cancel()
+        await self._stop_web()
+        await asyncio.gather(web_task, *[bot_task] if bot_task else [], return_exceptions=True)
+
+    def stop(self) -> None:
+        logger.info("Stopping services")
+        self._stopping.set()
 
-    process1.join()
-    process2.join()
\ No newline at end of file
+    async def _keep_running(self, name: str, start: Callable[[], Awaitable]) -> None:
+        failures = 0
+        while not self._stopping.is_set():
+            started_at = time.monotonic()
+            try:
+                await start()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("%s failed", name)
+            if self._stopping.is_set():
+                return
+            # сервис, проработавший долго, упал не из-за ошибки запуска: задержка начинается заново
+            if time.monotonic() - started_at > self.config.restart_reset_after:
+                failures = 0
+            failures += 1
+            delay = min(self.config.restart_backoff * 2 ** (failures - 1), self.config.restart_backoff_max)
+            logger.info("Restarting %s in %.1fs", name, delay)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except TimeoutError:
+                pass
+
+    async def _run_web(self) -> None:
+        self.web_process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(APP_DIR, "serve.py"), "--host", self.config.web_host,
+            "--port", str(self.config.web_port), "--workers", str(self.config.web_workers),
+            # относительные пути из .env (кэш координат, хранилище маршрутов) считаются от src, как и у бота
+            cwd=SRC_DIR
+        )
+        code = await self.web_process.wait()
+        logger.info("Web service exited with code %d", code)
+
+    async def _stop_web(self) -> None:
+        process = self.web_process
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), SHUTDOWN_TIMEOUT)
+        except TimeoutError:
+            logger.warning("Web service did not stop in %ds, killing it", SHUTDOWN_TIMEOUT)
+            process.kill()
+            await process.wait()
+
+    async def _wait_web_ready(self) -> bool:
+        """Ждет, пока веб-сервис не ответит на /api/health. Возвращает False, если пришел сигнал остановки"""
+        host = "127.0.0.1" if self.config.web_host in ("", "0.0.0.0") else self.config.web_host
+        url = f"http://{host}:{self.config.web_port}/api/health"
+        started = time.monotonic()
+        warned = False
+        async with aiohttp.ClientSession() as session:
+            while not self._stopping.is_set():
+                try:
+                    async with session.get(url, timeout=aiohttp.ClientTimeout(total=1)) as r:
+                        if r.status == 200:
+                            return True
+                except (aiohttp.ClientError, TimeoutError):
+                    pass
+                if not warned and time.monotonic() - started > self.config.web_ready_timeout:
+                    logger.warning("Web service is not ready after %.0fs, still waiting", self.config.web_ready_timeout)
+                    warned = True
+                await asyncio.sleep(READY_POLL_INTERVAL)
+        return False
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(Supervisor(Config()).run())